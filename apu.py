@@ -1,8 +1,45 @@
 class APU:
-    def __init__(self):
+    def __init__(self, scheduler, timer):
+        self.scheduler = scheduler
+        self.timer = timer # the frame sequencer is clocked by DIV
+        timer.on_div_reset = self.schedule_step
         self.NR52 = 0x0 # Audio master control
         self.NR51 = 0x0 # Sound panning
         self.NR50 = 0x0 # Master volume & VIN panning
+        self.synced = 0
 
-    def tick(self):
-        pass
\ No newline at end of file
+        # frame sequencer (length counters, sweep and envelopes), steps at 512 Hz while sound is on
+        self.frame_step = 0
+        self.step_event = None
+
+    def map_io(self, mem):
+        mem.map_register(0xFF24, self, "NR50")
+        mem.map_register(0xFF25, self, "NR51")
+        # bits 0 - 3 are the channels' on flags (no channels yet), 4 - 6 are unused and read as 1
+        mem.map_io(0xFF26, lambda: (self.NR52 & 0x80) | 0x70, self.write_NR52)
+
+    def sync(self, now: int):
+        # catches up to Memory.cycles (nothing is emulated per cycle yet)
+        self.synced = now
+
+    def schedule_step(self):
+        # the next step is when DIV bit 4 goes from 1 to 0, call after the timer is synced whenever
+        # NR52 or DIV changed
+        if self.step_event is not None:
+            self.scheduler.cancel(self.step_event)
+            self.step_event = None
+        if self.NR52 & 0x80:
+            timer = self.timer
+            self.step_event = self.scheduler.schedule(timer.synced + 0x800 - (timer.counter & 0x7FF), self.step)
+
+    def step(self, when: int):
+        # channels aren't emulated yet, so there is nothing to clock
+        self.frame_step = (self.frame_step + 1) & 0x7
+        self.step_event = self.scheduler.schedule(when + 0x800, self.step)
+
+    def write_NR52(self, value: int):
+        # turning the APU on resets the frame sequencer
+        if value & 0x80 and not self.NR52 & 0x80:
+            self.frame_step = 0
+        self.NR52 = value
+        self.schedule_step()
@@ -0,0 +1,259 @@
+import ast
+import inspect
+from array import array
+
+import opcodeHandlers
+from opcodeCases import opCodeTable, pack_flags
+from opcodeHandlers import HANDLERS, op_illegal
+from prefixedHandlers import prefixed_source
+
+# optional block compiler (CPU(..., dispatch="block")):
+# instead of fetching and dispatching one opcode at a time, a straight-line run of instructions
+# starting at PC is decoded once into a single python function and cached by (bank, PC).
+# the function bodies are the handlers from opcodeHandlers.py / prefixedHandlers.py with
+#   - t.read_imm_u8() / t.read_imm_u16() replaced by the operand bytes (known when compiling)
+#   - the registers and the pending flag record kept in locals (t_a, t_f, ...) for the whole block
+#   - the fetch cycles of the opcode and operand bytes added up and spent with mem.advance()
+# memory accesses still go through Memory.read/write/tick so their cycles are counted as usual
+
+# registers a block keeps in locals, loaded on entry and stored back before returning
+REGISTERS = ["a", "f", "b", "c", "d", "e", "h", "l", "SP", "PC", "flag_op", "flag_x", "flag_r"]
+
+# stand-ins for the flag properties on opCodeTable (same logic, but reading the locals)
+FLAG_READS = {
+	"Z": "(int(not t_flag_r & 0xFF) if t_flag_op else t_f >> 7)",
+	"N": "(int(t_flag_op == FLAGS_DEC) if t_flag_op else (t_f >> 6) & 1)",
+	"H": "(((t_flag_x ^ t_flag_r) >> 4) & 1 if t_flag_op else (t_f >> 5) & 1)",
+	"C": "((t_f >> 4) & 1)",
+}
+# stand-in for t.sync_flags(), also put in front of anything calling t.flag_bits()
+SYNC_FLAGS = "if t_flag_op:\n\tt_f = pack_flags(t_flag_op, t_flag_x, t_flag_r, t_f)\n\tt_flag_op = FLAGS_DONE"
+FLAG_LOCALS = ["f", "flag_op", "flag_x", "flag_r"]
+
+# Memory methods the handlers call, bound to locals once per block (mem_read = t.mem.read, ...)
+MEM_METHODS = ["read", "write", "tick", "advance"]
+
+MAX_INSTRUCTIONS = 32
+
+def table_attr(node) -> str:
+	# "x" for t.x, None for anything else
+	if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "t":
+		return node.attr
+	return None
+
+def calls(node, method: str) -> bool:
+	return any(isinstance(n, ast.Call) and table_attr(n.func) == method for n in ast.walk(node))
+
+class Template:
+	# one handler: its mnemonic, source, length in bytes and whether the block has to end after it
+	def __init__(self, source: str, length: int):
+		func = ast.parse(source).body[0]
+		self.name = source.splitlines()[0].split("#", 1)[1].strip()
+		self.source = source
+		self.length = length
+
+		stores = {table_attr(n) for n in ast.walk(func) if isinstance(getattr(n, "ctx", None), ast.Store)}
+		stores.discard(None)
+		# jumps, calls, returns and anything touching state outside the registers (halted, EI/DI/RETI),
+		# interrupts are only looked at between blocks. so are memory writes: one to IF/IE can make
+		# an interrupt pending and one to DMA swaps the bus out from under mem_read
+		self.ends_block = "PC" in stores or bool(stores - set(REGISTERS)) or "t.interrupts" in source \
+			or "t.mem.write" in source
+
+def build_templates() -> list:
+	templates = [None] * 0x100
+	for code in range(0x100):
+		handler = HANDLERS[code]
+		source = inspect.getsource(handler)
+		# the illegal opcodes are left to the interpreter, CB goes through PREFIXED_TEMPLATES
+		if handler is op_illegal or code == 0xCB:
+			continue
+		length = 1 + source.count("t.read_imm_u8()") + 2 * source.count("t.read_imm_u16()")
+		templates[code] = Template(source, length)
+	return templates
+
+TEMPLATES = build_templates()
+PREFIXED_TEMPLATES = [Template(prefixed_source(code), 2) for code in range(0x100)]
+
+class Translate(ast.NodeTransformer):
+	# rewrites a (copied) handler body to run inside a block function
+	def __init__(self, operands: list):
+		self.operands = operands # operand bytes in the order the handler reads them
+		self.used = set() # registers the block has to load
+		self.stored = set() # registers the block has to store back
+
+	def visit_Call(self, node):
+		method = table_attr(node.func)
+		if method == "read_imm_u8":
+			return ast.Constant(self.operands.pop(0))
+		if method == "read_imm_u16":
+			lsb = self.operands.pop(0)
+			msb = self.operands.pop(0)
+			return ast.Constant((msb << 8) | lsb)
+		if method == "flag_bits":
+			# the flags were synced in front of this statement
+			self.used.add("f")
+			return ast.Name("t_f", ast.Load())
+		return self.generic_visit(node)
+
+	def visit_Expr(self, node):
+		if isinstance(node.value, ast.Call) and table_attr(node.value.func) == "sync_flags":
+			return self.sync_flags()
+		return self.generic_visit(node)
+
+	def visit_Attribute(self, node):
+		attr = table_attr(node)
+		if attr in REGISTERS:
+			self.used.add(attr)
+			if isinstance(node.ctx, ast.Store):
+				self.stored.add(attr)
+			return ast.Name(f"t_{attr}", node.ctx)
+		if attr in FLAG_READS and isinstance(node.ctx, ast.Load):
+			self.used.update(FLAG_LOCALS)
+			return ast.parse(FLAG_READS[attr], mode="eval").body
+		if table_attr(node.value) == "mem" and node.attr in MEM_METHODS:
+			# t.mem.read -> mem_read, bound once per block
+			return ast.Name(f"mem_{node.attr}", ast.Load())
+		return self.generic_visit(node)
+
+	def sync_flags(self) -> ast.stmt:
+		self.used.update(FLAG_LOCALS)
+		self.stored.update(["f", "flag_op"])
+		return ast.parse(SYNC_FLAGS).body[0]
+
+	def translate(self, source: str) -> list:
+		# parsing again is a lot cheaper than deep copying the tree
+		out = []
+		for stmt in ast.parse(source).body[0].body:
+			if calls(stmt, "flag_bits"):
+				out.append(self.sync_flags())
+			out.append(self.visit(stmt))
+		return out
+
+class BlockCache:
+	def __init__(self, table: opCodeTable, max_instructions: int = MAX_INSTRUCTIONS):
+		self.table = table
+		self.mem = table.mem
+		self.max_instructions = max_instructions
+
+		self.blocks = {} # (bank, pc) -> compiled function, None if pc can't be compiled
+		self.sources = {} # (bank, pc) -> generated source, handy when debugging
+		self.spans = {} # (bank, pc) -> (first, last + 1) watched address of the block
+		self.pages = {} # addr >> 8 -> keys of the watched blocks overlapping that page
+
+		self.namespace = dict(vars(opcodeHandlers))
+		self.namespace["pack_flags"] = pack_flags
+
+		# 16-bit counts (a lot of blocks can start in front of the same address)
+		self.mem.code_refs = array("H", bytes(0x20000))
+		self.mem.on_code_write = self.code_written
+
+	def lookup(self, pc: int):
+		key = (self.mem.banks[pc >> 13], pc)
+		try:
+			return self.blocks[key]
+		except KeyError:
+			block = self.blocks[key] = self.compile(key)
+			return block
+
+	def compile(self, key: tuple):
+		start = key[1]
+		peek = self.mem.peek
+
+		body = []
+		used = set()
+		stored = set()
+		mem_calls = set()
+		pending = 0 # fetch cycles not spent yet
+		size = 0 # bytes decoded so far
+		pc = start
+		pc_known = True # t_PC hasn't been changed by the block (only the last instruction can)
+		for _ in range(self.max_instructions):
+			code = peek(pc)
+			if code == 0xCB:
+				template = PREFIXED_TEMPLATES[peek((pc + 1) & 0xFFFF)]
+				operands = []
+			else:
+				template = TEMPLATES[code]
+				if template is None:
+					break
+				operands = [peek((pc + i) & 0xFFFF) for i in range(1, template.length)]
+			# don't run off the end of an 8K region, the next one may be banked differently
+			if size and (start + size + template.length - 1) >> 13 != start >> 13:
+				break
+
+			translate = Translate(operands)
+			stmts = translate.translate(template.source)
+			next_pc = (pc + template.length) & 0xFFFF
+
+			body.append(f"# {pc:04X}: {template.name}")
+			pending += template.length
+			names = {n.id for stmt in stmts for n in ast.walk(stmt) if isinstance(n, ast.Name)}
+			if any(name.startswith("mem_") for name in names):
+				mem_calls |= names
+				body.append(f"mem_advance({pending})")
+				pending = 0
+			if "PC" in translate.used:
+				body.append(f"t_PC = {next_pc:#06x}")
+				pc_known = "PC" not in translate.stored
+			for stmt in stmts:
+				body += ast.unparse(stmt).splitlines()
+
+			used |= translate.used
+			stored |= translate.stored
+			pc = next_pc
+			size += template.length
+			if template.ends_block:
+				break
+
+		self.watch(key, start, max(size, 1))
+		if not size:
+			return None
+
+		if pending:
+			body.append(f"mem_advance({pending})")
+		used.discard("PC")
+		stored.discard("PC")
+		head = [f"t_{reg} = t.{reg}" for reg in REGISTERS if reg in used]
+		mem_calls.add("mem_advance")
+		head += [f"{name} = t.mem.{name[4:]}" for name in sorted(mem_calls) if name.startswith("mem_")]
+		tail = [f"t.{reg} = t_{reg}" for reg in REGISTERS if reg in stored]
+		tail.append(f"t.PC = {pc:#06x}" if pc_known else "t.PC = t_PC")
+
+		name = f"block_{key[0]:02X}_{start:04X}"
+		source = f"def {name}(t):\n" + "".join(f"\t{line}\n" for line in head + body + tail)
+		self.sources[key] = source
+		exec(compile(source, f"<{name}>", "exec"), self.namespace)
+		return self.namespace.pop(name)
+
+	def watch(self, key: tuple, start: int, length: int):
+		# ROM can't be written (writes there go to the MBC), so only blocks in RAM are watched
+		if start < 0x8000 and not self.mem.testing:
+			return
+		end = start + length
+		self.spans[key] = (start, end)
+		for addr in range(start, end):
+			self.mem.code_refs[addr & 0xFFFF] += 1
+		for page in range(start >> 8, ((end - 1) >> 8) + 1):
+			self.pages.setdefault(page & 0xFF, set()).add(key)
+
+	def code_written(self, addr: int):
+		for key in list(self.pages.get(addr >> 8, ())):
+			start, end = self.spans[key]
+			if start <= addr < end or start <= addr + 0x10000 < end:
+				self.drop(key)
+
+	def drop(self, key: tuple):
+		start, end = self.spans.pop(key)
+		for addr in range(start, end):
+			self.mem.code_refs[addr & 0xFFFF] -= 1
+		for page in range(start >> 8, ((end - 1) >> 8) + 1):
+			self.pages[page & 0xFF].discard(key)
+		del self.blocks[key]
+		self.sources.pop(key, None)
+
+	def clear(self):
+		for key in list(self.spans):
+			self.drop(key)
+		self.blocks.clear()
+		self.sources.clear()
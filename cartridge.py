@@ -0,0 +1,254 @@
+import mmap
+import os
+
+# external RAM size for the header byte at 0x149
+RAM_SIZES = {0x00: 0, 0x01: 0x800, 0x02: 0x2000, 0x03: 0x8000, 0x04: 0x20000, 0x05: 0x10000}
+
+class Cartridge:
+    # ROM only (32 KiB, optionally up to 8 KiB of RAM), and the base of the MBCs below
+    # the controller doesn't sit between the CPU and the ROM/RAM: whenever a bank register changes
+    # it points Memory's page table at the right slice of the ROM/RAM (memoryviews, nothing is copied)
+    # and the accesses go straight to it. writes to 0x0000 - 0x7FFF come through write(), external RAM
+    # accesses only come through read_ram/write_ram while nothing is mapped there (disabled, RTC, ...)
+    def __init__(self, rom, mem, has_ram: bool, battery: bool, save_path: str = None):
+        self.mem = mem
+        self.rom = memoryview(rom)
+        self.rom_banks = max(2, len(rom) // 0x4000)
+        ram_size = RAM_SIZES.get(rom[0x149], 0) if has_ram else 0
+        self.battery = battery # RAM keeps its contents without power (saved games)
+        if battery and ram_size and save_path:
+            self.ram = open_save(save_path, ram_size)
+        else:
+            self.ram = bytearray(ram_size)
+
+        # the pages of every bank, switching banks swaps these lists into Memory's page table
+        # (see Memory.split). ROM banks are split the first time they get mapped
+        self.rom_pages = [None] * self.rom_banks
+        ram = memoryview(self.ram)
+        self.ram_pages = [mem.split(ram[start:start + 0x2000]) for start in range(0, len(ram), 0x2000)]
+
+        self.rom_bank0 = 0 # bank at 0x0000 - 0x3FFF
+        self.rom_bank = 1 # bank at 0x4000 - 0x7FFF
+        self.ram_bank = 0
+        self.ram_enabled = True # there is nothing to enable it with without an MBC
+        # what is mapped right now, so writing the bank that is already there costs nothing
+        # (mapped_ram is None while 0xA000 - 0xBFFF is unmapped)
+        self.mapped_bank0 = None
+        self.mapped_bank = None
+        self.mapped_ram = None
+        self.map_rom()
+        self.map_ram()
+
+    def write(self, addr: int, value: int):
+        # no registers to write to
+        pass
+
+    def read_ram(self, addr: int) -> int:
+        return 0xFF
+
+    def enable_ram(self, value: int):
+        # writes to 0x0000 - 0x1FFF, games disable the RAM once they are done saving so that's
+        # when the save file gets written out
+        enabled = value & 0xF == 0xA
+        if self.ram_enabled and not enabled:
+            self.flush()
+        self.ram_enabled = enabled
+        self.map_ram()
+
+    def flush(self):
+        # writes the pages of the save file that changed to disk (the OS would get to it eventually)
+        if isinstance(self.ram, mmap.mmap):
+            self.ram.flush()
+
+    def write_ram(self, addr: int, value: int):
+        pass
+
+    def bank_pages(self, bank: int) -> tuple:
+        pages = self.rom_pages[bank]
+        if pages is None:
+            pages = self.rom_pages[bank] = self.mem.split(self.rom[bank * 0x4000:(bank + 1) * 0x4000])
+        return pages
+
+    def map_rom(self):
+        # the bank number wraps around to the size of the ROM (which is always a power of 2)
+        bank0 = self.rom_bank0 & (self.rom_banks - 1)
+        if bank0 != self.mapped_bank0:
+            self.mapped_bank0 = bank0
+            self.mem.map_bank(0x0000, self.bank_pages(bank0), bank0, False)
+        bank = self.rom_bank & (self.rom_banks - 1)
+        if bank != self.mapped_bank:
+            self.mapped_bank = bank
+            self.mem.map_bank(0x4000, self.bank_pages(bank), bank, False)
+
+    def map_ram(self):
+        bank = self.ram_bank % len(self.ram_pages) if self.ram_enabled and self.ram_pages else None
+        if bank == self.mapped_ram:
+            return
+        self.mapped_ram = bank
+        self.mem.unmap(0xA000, 0x2000)
+        if bank is not None:
+            self.mem.map_bank(0xA000, self.ram_pages[bank], bank, True)
+
+class MBC1(Cartridge):
+    # 0x0000 - 0x1FFF RAM enable, 0x2000 - 0x3FFF ROM bank (5 bits), 0x4000 - 0x5FFF RAM bank or
+    # upper 2 bits of the ROM bank, 0x6000 - 0x7FFF banking mode (1 = the upper bits also bank
+    # 0x0000 - 0x3FFF and RAM)
+    def __init__(self, rom, mem, has_ram: bool, battery: bool, save_path: str = None):
+        self.bank_low = 1
+        self.bank_high = 0
+        self.mode = 0
+        super().__init__(rom, mem, has_ram, battery, save_path)
+        self.ram_enabled = False
+        self.map_ram()
+
+    def write(self, addr: int, value: int):
+        if addr < 0x2000:
+            self.enable_ram(value)
+        elif addr < 0x4000:
+            # bank 0 can't be selected here, it turns into 1
+            self.bank_low = value & 0x1F or 1
+            self.map_rom()
+        elif addr < 0x6000:
+            self.bank_high = value & 0x3
+            self.map_rom()
+            self.map_ram()
+        else:
+            self.mode = value & 0x1
+            self.map_rom()
+            self.map_ram()
+
+    def map_rom(self):
+        self.rom_bank0 = self.bank_high << 5 if self.mode else 0
+        self.rom_bank = (self.bank_high << 5) | self.bank_low
+        super().map_rom()
+
+    def map_ram(self):
+        self.ram_bank = self.bank_high if self.mode else 0
+        super().map_ram()
+
+class MBC3(Cartridge):
+    # 0x0000 - 0x1FFF RAM/RTC enable, 0x2000 - 0x3FFF ROM bank (7 bits), 0x4000 - 0x5FFF RAM bank
+    # (0 - 3) or RTC register (8 - C), 0x6000 - 0x7FFF writing 0 then 1 latches the RTC
+    # NOTE: the RTC registers can be read and written but the clock doesn't run yet
+    def __init__(self, rom, mem, has_ram: bool, battery: bool, save_path: str = None):
+        self.rtc = [0] * 5 # seconds, minutes, hours, day low, day high/flags
+        self.latched = [0] * 5
+        self.latch = 0xFF
+        super().__init__(rom, mem, has_ram, battery, save_path)
+        self.ram_enabled = False
+        self.map_ram()
+
+    def write(self, addr: int, value: int):
+        if addr < 0x2000:
+            self.enable_ram(value)
+        elif addr < 0x4000:
+            self.rom_bank = value & 0x7F or 1
+            self.map_rom()
+        elif addr < 0x6000:
+            self.ram_bank = value & 0xF
+            self.map_ram()
+        else:
+            if self.latch == 0 and value == 1:
+                self.latched = self.rtc[:]
+            self.latch = value
+
+    def map_ram(self):
+        if self.ram_bank >= 0x8:
+            # an RTC register, goes through read_ram/write_ram
+            self.mapped_ram = None
+            self.mem.unmap(0xA000, 0x2000)
+            return
+        super().map_ram()
+
+    def read_ram(self, addr: int) -> int:
+        if self.ram_enabled and 0x8 <= self.ram_bank <= 0xC:
+            return self.latched[self.ram_bank - 0x8]
+        return 0xFF
+
+    def write_ram(self, addr: int, value: int):
+        if self.ram_enabled and 0x8 <= self.ram_bank <= 0xC:
+            self.rtc[self.ram_bank - 0x8] = value
+
+class MBC5(Cartridge):
+    # 0x0000 - 0x1FFF RAM enable, 0x2000 - 0x2FFF low 8 bits of the ROM bank, 0x3000 - 0x3FFF
+    # bit 8 of the ROM bank, 0x4000 - 0x5FFF RAM bank (0 - F). unlike the others bank 0 can be
+    # mapped at 0x4000
+    def __init__(self, rom, mem, has_ram: bool, battery: bool, save_path: str = None):
+        super().__init__(rom, mem, has_ram, battery, save_path)
+        self.ram_enabled = False
+        self.map_ram()
+
+    def write(self, addr: int, value: int):
+        if addr < 0x2000:
+            self.enable_ram(value)
+        elif addr < 0x3000:
+            self.rom_bank = (self.rom_bank & 0x100) | value
+            self.map_rom()
+        elif addr < 0x4000:
+            self.rom_bank = (self.rom_bank & 0xFF) | ((value & 0x1) << 8)
+            self.map_rom()
+        elif addr < 0x6000:
+            self.ram_bank = value & 0xF
+            self.map_ram()
+
+# cartridge type (header byte 0x147) -> (controller, has RAM, has a battery)
+CARTRIDGE_TYPES = {
+    0x00: (Cartridge, False, False),
+    0x01: (MBC1, False, False),
+    0x02: (MBC1, True, False),
+    0x03: (MBC1, True, True),
+    0x08: (Cartridge, True, False),
+    0x09: (Cartridge, True, True),
+    0x0F: (MBC3, False, True),
+    0x10: (MBC3, True, True),
+    0x11: (MBC3, False, False),
+    0x12: (MBC3, True, False),
+    0x13: (MBC3, True, True),
+    0x19: (MBC5, False, False),
+    0x1A: (MBC5, True, False),
+    0x1B: (MBC5, True, True),
+    0x1C: (MBC5, False, False),
+    0x1D: (MBC5, True, False),
+    0x1E: (MBC5, True, True),
+}
+
+# ROM images that are already open, real path -> ((size, mtime), mapping). every Memory running the
+# same game shares one read-only mapping (and forked processes share the OS page cache behind it),
+# pages are only read in from the file as they get touched. a file that was rebuilt since gets a
+# new mapping, the old one goes away once the Memorys using it do
+ROM_IMAGES = {}
+
+def open_rom(rom_path: str) -> mmap.mmap:
+    key = os.path.realpath(rom_path)
+    with open(key, "rb") as f:
+        stat = os.fstat(f.fileno())
+        version = (stat.st_size, stat.st_mtime_ns)
+        cached = ROM_IMAGES.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        # the mapping stays valid after the file is closed
+        image = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    ROM_IMAGES[key] = (version, image)
+    return image
+
+def open_save(save_path: str, size: int) -> mmap.mmap:
+    # battery backed RAM lives in the save file, stores go straight into the mapping and only
+    # reach the disk on flush() (or whenever the OS decides to write the dirty pages back)
+    fd = os.open(save_path, os.O_RDWR | os.O_CREAT)
+    try:
+        if os.fstat(fd).st_size < size:
+            # a new save (or one from a smaller cartridge) starts out zeroed
+            os.ftruncate(fd, size)
+        return mmap.mmap(fd, size, access=mmap.ACCESS_WRITE)
+    finally:
+        os.close(fd)
+
+def load_cartridge(rom, mem, save_path: str = None) -> Cartridge:
+    # picks the controller from the header and maps the ROM (and RAM) into mem, battery backed RAM
+    # is kept in save_path
+    kind = rom[0x147]
+    if kind not in CARTRIDGE_TYPES:
+        print("unsupported cartridge type:", hex(kind))
+        exit(1)
+    controller, has_ram, battery = CARTRIDGE_TYPES[kind]
+    return controller(rom, mem, has_ram, battery, save_path)
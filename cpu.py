@@ -1,36 +1,158 @@
 from memory import Memory
 from opcodeCases import opCodeTable
-from typing import List
+from opcodeHandlers import HANDLERS
+from spinLoop import SpinLoops
 
 class CPU:
     M_CYCLES_PER_FRAME = 17556
 
-    def __init__(self, rom: str):
-        self.mem = Memory(rom)
+    def __init__(self, rom: str, dispatch: str = "table", renderer: str = "fifo"):
+        # renderer picks how the PPU draws, "fifo" or "scanline" (see PPU)
+        self.mem = Memory(rom, renderer)
         self.table = opCodeTable(self.mem)
+        self.interrupts = self.mem.interrupts
+
+        # "table" indexes HANDLERS with the opcode, "match" goes through the big match
+        # statement in opCodeTable.tableLookup (kept around as the reference implementation)
+        # and "block" runs whole compiled blocks of instructions (see blockCompiler.py)
+        self.spins = SpinLoops(self.table)
+        self.blocks = None
+        if dispatch == "match":
+            self.execute = self.execute_match
+        elif dispatch == "block":
+            # compiling the handler templates takes a while, so it's only imported when it's used
+            from blockCompiler import BlockCache
+            self.blocks = BlockCache(self.table)
+            self.execute = self.execute_block
 
     def execute(self) -> int:
         # each instruction starts by reading the byte at PC which represents the opcode
         # (hint: this is where you reference an opcode table to figure out how to process it)
+        if self.interrupts.pending:
+            self.service_interrupt()
+
+        table = self.table
+        mem = self.mem
+        pc = table.PC
+        # Memory.fetch inlined, the opcode comes straight out of the cached region if PC is in it
+        offset = pc - mem.fetch_base
+        if 0 <= offset < 0x2000:
+            mem.ticks_per_instr += 1
+            mem.cycles += 1
+            opcode = mem.fetch_buffer[offset]
+        else:
+            opcode = mem.fetch(pc)
+        table.PC = (pc + 1) & 0xFFFF
+
+        HANDLERS[opcode](table)
+        return
+
+    def execute_match(self) -> int:
+        if self.interrupts.pending:
+            self.service_interrupt()
+
         opcode = self.mem.read(self.table.PC)
         self.table.PC = (self.table.PC + 1) & 0xFFFF
 
         #take opcode found and execute using table
         #print(hex(opcode))
         self.table.tableLookup(opcode)
-        return 
+        return
+
+    def execute_block(self) -> int:
+        # runs every instruction of the block starting at PC in one go
+        if self.interrupts.pending:
+            self.service_interrupt()
+
+        # ei_delay counts instructions, so the one after EI runs on its own
+        block = None if self.interrupts.ei_delay else self.blocks.lookup(self.table.PC)
+        if block is None:
+            # the illegal opcodes aren't compiled
+            table = self.table
+            opcode = self.mem.fetch(table.PC)
+            table.PC = (table.PC + 1) & 0xFFFF
+            HANDLERS[opcode](table)
+            return
+        block(self.table)
+        return
+
+    def service_interrupt(self):
+        # only called while interrupts.pending is set
+        interrupts = self.interrupts
+        if interrupts.ei_delay:
+            # EI takes effect after the instruction that follows it
+            interrupts.ei_delay -= 1
+            if interrupts.ei_delay:
+                return
+            interrupts.set_ime(1)
+            if not interrupts.pending:
+                return
+
+        table = self.table
+        mem = self.mem
+        if table.halted:
+            if not interrupts.requested & table.wake_mask:
+                # a STOP only wakes up for the joypad, the others wait until then
+                return
+            # PC is still on the HALT (or the 2 byte STOP), return past it
+            table.halted = False
+            table.PC = (table.PC + (2 if mem.peek(table.PC) == 0x10 else 1)) & 0xFFFF
+
+        # the handler's cycles aren't part of any loop iteration
+        self.spins.last = None
+
+        # 5 M-cycles: 2 waiting, 2 pushing PC and 1 jumping to the handler
+        vector = interrupts.acknowledge()
+        mem.tick()
+        mem.tick()
+        table.SP = (table.SP - 1) & 0xFFFF
+        mem.write(table.SP, table.PC >> 8)
+        table.SP = (table.SP - 1) & 0xFFFF
+        mem.write(table.SP, table.PC & 0xFF)
+        table.PC = vector
+        mem.tick()
+
+    def wait_for_interrupt(self, frame_end: int):
+        # halted, nothing happens until an interrupt is requested and only an event can request one,
+        # so the clock jumps from event to event until one it waits for is (or the frame ends), then
+        # the HALT/STOP runs again and notices it
+        mem = self.mem
+        scheduler = mem.scheduler
+        wake_mask = self.table.wake_mask
+        while not self.interrupts.requested & wake_mask and mem.cycles < frame_end:
+            deadline = min(scheduler.deadline, frame_end)
+            if deadline > mem.cycles:
+                mem.advance(deadline - mem.cycles)
+            scheduler.run(mem.cycles)
 
-    def render_frame(self) -> List[List[int]]:
+    def render_frame(self) -> memoryview:
         # each frame takes a fixed length of "time" to render and the way
         # we represent this "time" is through CPU M-cycles. An instruction
         # that is executed can vary between 1-N M-cycles (machine cycles) and
-        # we sum the total amount of M-cycles processed per frame here
-        m_cycles_ran = 0
+        # Memory.cycles counts every one of them
+        table = self.table
+        mem = self.mem
+        scheduler = mem.scheduler
 
         # After 17556 M-cycles, a frame is rendered!
-        while m_cycles_ran < self.M_CYCLES_PER_FRAME:
-            self.execute()
-            m_cycles_ran += self.mem.ticks_per_instr
-            self.mem.ticks_per_instr = 0
+        frame_end = mem.cycles + self.M_CYCLES_PER_FRAME
+        while mem.cycles < frame_end:
+            # instructions run back to back until the next event is due, then the events run. the
+            # deadline is read again after every instruction, writing TAC/TIMA or starting a serial
+            # transfer can schedule an event sooner than the one that was next
+            while mem.cycles < scheduler.deadline and mem.cycles < frame_end:
+                pc = table.PC
+                self.execute()
+                if table.PC <= pc:
+                    # jumped backwards (or stayed on a HALT), the CPU may just be waiting for something,
+                    # skipped cycles are spent through Memory.advance
+                    if table.halted:
+                        self.wait_for_interrupt(frame_end)
+                    else:
+                        self.spins.skip(pc, min(scheduler.deadline, frame_end))
+            scheduler.run(mem.cycles)
 
+        mem.ticks_per_instr = 0
+        mem.sync()
+        # the last whole frame, 144 x 160 shades (see PPU)
         return self.mem.ppu.frame
\ No newline at end of file
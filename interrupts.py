@@ -0,0 +1,67 @@
+# interrupt sources, the bit each one uses in IF (0xFF0F) and IE (0xFFFF)
+# (in priority order, the handler for bit n lives at 0x40 + 8 * n)
+INT_VBLANK = 0x01
+INT_STAT = 0x02
+INT_TIMER = 0x04
+INT_SERIAL = 0x08
+INT_JOYPAD = 0x10
+INT_ALL = 0x1F
+
+class Interrupts:
+    # IF, IE and IME live here. instead of the CPU working out IF & IE (and ime) before every
+    # instruction, the answer is cached and only recomputed when one of them changes:
+    #   requested - IF & IE, what HALT waits for (ime doesn't matter there)
+    #   pending - the CPU has to look at interrupts before its next instruction, either because
+    #             one should be serviced or because an EI is about to take effect
+    # so IF/IE/ime have to be changed through the methods below, not assigned directly
+    def __init__(self):
+        self.IF = 0x0 # interrupt flag, bit set = that interrupt has been requested
+        self.IE = 0x0 # interrupt enable
+        self.ime = 0 # interrupt master enable: if unset, interrupts absolutely cannot happen
+
+        # EI only enables interrupts after the instruction following it, counts down at every
+        # instruction (see CPU.service_interrupt)
+        self.ei_delay = 0
+
+        self.requested = 0
+        self.pending = False
+
+    def update(self):
+        self.requested = self.IF & self.IE & 0x1F
+        self.pending = bool(self.ime and self.requested) or self.ei_delay > 0
+
+    def map_io(self, mem):
+        # the unused top 3 bits of IF read as 1 (IE at 0xFFFF isn't in the IO range, Memory handles it)
+        mem.map_io(0xFF0F, lambda: self.IF | 0xE0, self.write_IF)
+
+    def request(self, bit: int):
+        self.IF |= bit
+        self.update()
+
+    def write_IF(self, value: int):
+        self.IF = value & 0x1F
+        self.update()
+
+    def write_IE(self, value: int):
+        self.IE = value
+        self.update()
+
+    def set_ime(self, value: int):
+        # DI right after EI cancels it
+        self.ime = value
+        self.ei_delay = 0
+        self.update()
+
+    def enable_delayed(self):
+        # EI
+        if not self.ime:
+            self.ei_delay = 2
+            self.update()
+
+    def acknowledge(self) -> int:
+        # clears the highest priority requested interrupt and ime, returns its vector
+        bit = self.requested & -self.requested
+        self.IF &= ~bit
+        self.ime = 0
+        self.update()
+        return 0x40 + 8 * (bit.bit_length() - 1)
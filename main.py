@@ -3,4 +3,7 @@ from cpu import CPU
 cpu = CPU("test_roms/cpu_instrs.gb")
 
 # TODO: will eventually be render a frame of 160x144 pixels
-cpu.render_frame()
\ No newline at end of file
+cpu.render_frame()
+
+# writes out the save file (if the cartridge has a battery)
+cpu.mem.close()
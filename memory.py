@@ -1,58 +1,274 @@
-from typing import List
+import os
 from timer import Timer
 from apu import APU
 from ppu import PPU
+from serial import Serial
+from interrupts import Interrupts
+from scheduler import Scheduler
+from functools import partial
+from cartridge import open_rom, load_cartridge
+
+# fetch_base while no region is cached, far enough away that addr - fetch_base is never in one
+NO_REGION = -0x10000
+
+# code_refs of every Memory that doesn't run compiled blocks, nothing ever counts up in it so they
+# can all share it
+NO_CODE = bytes(0x10000)
 
 class Memory:
-    def __init__(self, rom: str):
+    def __init__(self, rom: str, renderer: str = "fifo"):
         self.testing = False
         
-        self.rom: List[int] = [0] * 0x8000
-        self.wram = [0] * 0x2000
-        #self.vram = [0] * 0x2000
-        #self.xram = [0] * 0x2000
-        self.oam = [0] * 0xA0 #sprites
-        self.hram = [0] * 0x7F
+        self.rom = bytes(0x8000)
+        self.wram = bytearray(0x2000)
+        self.hram = bytearray(0x7F)
+
+        # IF and IE (0xFF0F and 0xFFFF)
+        self.interrupts = Interrupts()
 
-        self.IF = 0x0
-        self.IE = 0x0
+        # future events of every component, in M-cycles since power on (see scheduler.py)
+        self.scheduler = Scheduler()
 
         # components of the Gameboy that memory has access to
-        self.timer = Timer()
-        self.apu = APU()
-        self.ppu = PPU()
+        self.timer = Timer(self.scheduler, self.interrupts.request)
+        self.apu = APU(self.scheduler, self.timer)
+        self.ppu = PPU(self.scheduler, self.interrupts.request, renderer)
+        self.serial = Serial(self.scheduler, self.interrupts.request)
+
+        # VRAM and OAM belong to the PPU, these are views of the same bytes
+        self.vram = memoryview(self.ppu.vram)
+        self.oam = memoryview(self.ppu.oam) #sprites
+
+        # memory mapped IO (0xFF00 - 0xFF7F), addr & 0x7F -> handler. every component maps its own
+        # registers (see map_io), the ones nobody maps read 0xFF and ignore writes like on hardware
+        self.io_reads = [self.read_unmapped] * 0x80
+        self.io_writes = [self.write_unmapped] * 0x80
+        for component in (self.interrupts, self.timer, self.apu, self.ppu, self.serial):
+            component.map_io(self)
+
+        # OAM DMA, while it runs (until dma_end) the CPU can only get to HRAM and IO (see read_dma)
+        self.DMA = 0xFF # 0xFF46, source address >> 8 of the last transfer
+        self.dma_end = 0
+        self.map_io(0xFF46, lambda: self.DMA, self.start_dma)
         
         self.ticks_per_instr = 0
+        self.cycles = 0 # M-cycles since power on
 
+        # page table for the cartridge bus: addr >> 8 -> 256 byte memoryview of whatever is mapped
+        # there, so most accesses are pages[addr >> 8][addr & 0xFF]. pages that need more than that
+        # (MMIO, writes to ROM, ...) are None and go through peek_decode/write_decode
+        self.read_pages = [None] * 0x100
+        self.write_pages = [None] * 0x100
+
+        # bank mapped at each 8 KiB region (addr >> 13), so things cached per address (compiled
+        # blocks, spin loops) can tell the banks of a switchable window apart
+        self.banks = [0] * 8
+
+        # instruction fetch (see fetch_cached): the 8 KiB regions that are mapped in one piece
+        # (addr >> 13 -> memoryview, None if they need the decoder) and the one PC is in right now,
+        # which is the only thing fetch has to check. fetch_base is NO_REGION when nothing is cached
+        self.regions = [None] * 8
+        self.fetch_base = NO_REGION
+        self.fetch_buffer = None
+
+        # number of compiled blocks (see blockCompiler.py) covering each address, writing to one
+        # of them calls on_code_write(addr) so the stale blocks get thrown away. the block cache
+        # puts its own counts in here
+        self.code_refs = NO_CODE
+        self.on_code_write = None
+
+        # read/peek/write are picked once here instead of checking for testing mode on every access
         if rom:
-            # loading the "game cartridge" into our emulator
-            with open(rom, "rb") as f:
-                self.rom = f.read()
+            # loading the "game cartridge" into our emulator (mapped, not read, see cartridge.py)
+            self.rom = open_rom(rom)
+            # the cartridge's controller maps the ROM and external RAM banks (see cartridge.py),
+            # battery backed RAM is saved next to the ROM (game.gb -> game.sav)
+            self.cartridge = load_cartridge(self.rom, self, os.path.splitext(rom)[0] + ".sav")
+            self.map(0xC000, self.wram, True)
+            # VRAM is only mapped for reads, writes go through write_decode to catch the PPU up first
+            self.map(0x8000, self.vram, False)
+            self.read = self.read_cartridge
+            self.peek = self.peek_cartridge
+            self.write = self.write_cartridge
+            self.fetch = self.fetch_cached
+            self.fetch16 = self.fetch16_cached
         else:
             # if no ROM is "inserted" the CPU is assumed to be in a mode for debugging
             # this array represents the entire memory in a plain array of bytes which
             # is used to test the integrity of tests
             self.testing = True
-            self.memory = [0] * 0x10000
+            self.memory = bytearray(0x10000)
+            self.read = self.read_flat
+            self.peek = self.peek_flat
+            self.write = self.write_flat
+            self.fetch = self.fetch_cached
+            self.fetch16 = self.fetch16_cached
+            view = memoryview(self.memory)
+            self.regions = [view[start:start + 0x2000] for start in range(0, 0x10000, 0x2000)]
+
 
+    def close(self):
+        # call when the emulator shuts down so the save file is up to date
+        if not self.testing:
+            self.cartridge.flush()
 
+    # the components aren't stepped on every M-cycle, the bus only counts cycles. whatever happens at
+    # a known time is a scheduled event (run between instructions by render_frame) and the rest is
+    # caught up (sync) when the CPU reads or writes a register
     def tick(self):
         self.ticks_per_instr += 1
-        # does 1 cycle of work across all connected components
-        self.ppu.tick()
-        self.apu.tick()
-        self.timer.tick()
+        self.cycles += 1
+
+    def advance(self, cycles: int):
+        # same as calling tick() cycles times, for callers that know their cycle count up front
+        self.ticks_per_instr += cycles
+        self.cycles += cycles
+
+    def sync(self):
+        # runs the events that came due during the current instruction and brings every component up to now
+        now = self.cycles
+        self.scheduler.run(now)
+        self.ppu.sync(now)
+        self.apu.sync(now)
+        self.timer.sync(now)
+
+    def cycles_until_event(self) -> int:
+        # M-cycles until a register changes without an event (DIV and TIMA counting up)
+        self.timer.sync(self.cycles)
+        return self.timer.cycles_until_change()
+
+    # flat bus (testing mode), the whole address space is self.memory
+    def read_flat(self, addr: int) -> int:
+        self.ticks_per_instr += 1
+        self.cycles += 1
+        return self.memory[addr]
+
+    def peek_flat(self, addr: int) -> int:
+        return self.memory[addr]
+
+    def write_flat(self, addr: int, value: int):
+        self.ticks_per_instr += 1
+        self.cycles += 1
+        if self.code_refs[addr]:
+            self.on_code_write(addr)
+        self.memory[addr] = value
+
+    def map_io(self, addr: int, read=None, write=None):
+        # read() returns the register, write(value) sets it. they are called after sync() so the
+        # components are up to date
+        if read is not None:
+            self.io_reads[addr & 0x7F] = read
+        if write is not None:
+            self.io_writes[addr & 0x7F] = write
+
+    def map_register(self, addr: int, component, name: str):
+        # a register that is nothing more than an attribute of component
+        self.map_io(addr, partial(getattr, component, name), partial(setattr, component, name))
+
+    @staticmethod
+    def read_unmapped() -> int:
+        return 0xFF
+
+    @staticmethod
+    def write_unmapped(value: int):
+        pass
+
+    @staticmethod
+    def split(buffer) -> tuple:
+        # the 256 byte pages of buffer (its length has to be whole pages) and its 8 KiB regions (None
+        # for a part that isn't a whole one). banks are split once and switched in with map_bank
+        view = memoryview(buffer)
+        pages = [view[offset:offset + 0x100] for offset in range(0, len(view), 0x100)]
+        regions = [view[offset:offset + 0x2000] for offset in range(0, len(view), 0x2000)]
+        return pages, [region if len(region) == 0x2000 else None for region in regions]
+
+    def map(self, start: int, buffer, writable: bool):
+        # points the pages from start on at buffer
+        self.map_pages(start, self.split(buffer), writable)
+
+    def map_pages(self, start: int, split: tuple, writable: bool):
+        pages, regions = split
+        first = start >> 8
+        self.read_pages[first:first + len(pages)] = pages
+        self.write_pages[first:first + len(pages)] = pages if writable else [None] * len(pages)
+        # whole 8 KiB regions can be fetched from directly
+        region = start >> 13
+        self.regions[region:region + len(regions)] = regions if not start & 0x1FFF else [None] * len(regions)
+        self.fetch_base = NO_REGION
+
+    def map_bank(self, start: int, split: tuple, bank: int, writable: bool):
+        # switches a bank in by swapping its pages (from split), nothing is copied
+        self.map_pages(start, split, writable)
+        for region in range(start >> 13, (start >> 13) + len(split[1])):
+            self.banks[region] = bank
+
+    def unmap(self, start: int, length: int):
+        # sends the pages back through peek_decode/write_decode
+        for page in range(start >> 8, (start + length) >> 8):
+            self.read_pages[page] = None
+            self.write_pages[page] = None
+        for region in range(start >> 13, (start + length + 0x1FFF) >> 13):
+            self.regions[region] = None
+        self.fetch_base = NO_REGION
 
     # sends data from memory to our CPU
-    def read(self, addr: int) -> int:
-        self.tick()
+    def read_cartridge(self, addr: int) -> int:
+        self.ticks_per_instr += 1
+        self.cycles += 1
+        page = self.read_pages[addr >> 8]
+        if page is None:
+            return self.peek_decode(addr)
+        return page[addr & 0xFF]
 
-        if self.testing:
-            return self.memory[addr]
-        
+    # reads the opcode and operand bytes at PC, same as read but without the page table lookup as
+    # long as PC stays in the region it was in last time (and nothing got mapped in the meantime).
+    # CPU.execute does the same check inline for opcodes
+    def fetch_cached(self, addr: int) -> int:
+        self.ticks_per_instr += 1
+        self.cycles += 1
+        offset = addr - self.fetch_base
+        if 0 <= offset < 0x2000:
+            return self.fetch_buffer[offset]
+        return self.fetch_region(addr)
+
+    def fetch16_cached(self, addr: int) -> int:
+        # both bytes of a 16-bit immediate (little endian)
+        self.ticks_per_instr += 2
+        self.cycles += 2
+        offset = addr - self.fetch_base
+        if 0 <= offset < 0x1FFF:
+            buffer = self.fetch_buffer
+            return buffer[offset] | (buffer[offset + 1] << 8)
+        return self.fetch_region(addr) | (self.fetch_region((addr + 1) & 0xFFFF) << 8)
+
+    def fetch_region(self, addr: int) -> int:
+        # PC is somewhere else now, caches its region if it can be fetched from directly
+        region = self.regions[addr >> 13]
+        if region is None:
+            # HRAM, IO, ... go through the page table every time
+            self.fetch_base = NO_REGION
+            return self.peek_cartridge(addr)
+        self.fetch_base = addr & 0xE000
+        self.fetch_buffer = region
+        return region[addr & 0x1FFF]
+
+    # reads without spending a cycle (used to decode instructions ahead of time)
+    def peek_cartridge(self, addr: int) -> int:
+        page = self.read_pages[addr >> 8]
+        if page is None:
+            return self.peek_decode(addr)
+        return page[addr & 0xFF]
+
+    # the whole address decode, for the pages the page table doesn't cover
+    def peek_decode(self, addr: int) -> int:
         match addr >> 12:
             case 0x0 | 0x1 | 0x2 | 0x3 | 0x4 | 0x5 | 0x6 | 0x7:
                 return self.rom[addr]
+            case 0x8 | 0x9:
+                return self.vram[addr - 0x8000]
+            case 0xA | 0xB:
+                # external RAM that isn't mapped (disabled, not there or an MBC3 clock register)
+                return self.cartridge.read_ram(addr)
             case 0xC | 0xD:
                 return self.wram[addr - 0xC000]
             case 0xE:
@@ -63,33 +279,91 @@ class Memory:
                     # Nintendo says use of this area is prohibited.
                     return 0xFF
                 elif addr >= 0xFE00 and addr <= 0xFE9F:
-                    return self.oam
+                    return self.oam[addr - 0xFE00]
                 elif addr >= 0xFEA0 and addr <= 0xFEFF:
                     # Nintendo says use of this area is prohibited.
                     return 0xFF
                 elif addr >= 0xFF80 and addr <= 0xFFFE:
-                    return self.hram
+                    return self.hram[addr - 0xFF80]
+                elif addr == 0xFFFF:
+                    return self.interrupts.IE
                 else:
-                    # memory mapped IO + IE (interrupt enable register)
-                    match addr:
-                        case 0xFF44:
-                            return self.ppu.LY
-                        case _:
-                            #vram and xram are here for now
-                            print("attempted to read from mmio register:", hex(addr))
-                            exit(1)
+                    # memory mapped IO
+                    self.sync()
+                    return self.io_reads[addr & 0x7F]()
+
+    def start_dma(self, value: int):
+        # copies 0xXX00 - 0xXX9F to OAM. the real thing copies a byte per M-cycle, here OAM gets
+        # all of it at once and the CPU is kept off the bus for the 160 M-cycles instead
+        self.DMA = value
+        source = value - 0x20 if value >= 0xE0 else value # 0xE000 and up is WRAM again
+        page = self.read_pages[source]
+        if page is not None:
+            self.oam[:] = page[:0xA0]
+        else:
+            self.oam[:] = bytes(self.peek_decode((source << 8) + i) for i in range(0xA0))
+        self.ppu.oam_written()
+        self.dma_end = self.cycles + 0xA0
+        self.fetch_base = NO_REGION # so CPU.execute doesn't go around fetch
+        self.read = self.read_dma
+        self.write = self.write_dma
+        self.fetch = self.read_dma
+        self.fetch16 = self.fetch16_dma
+
+    def end_dma(self):
+        self.read = self.read_cartridge
+        self.write = self.write_cartridge
+        self.fetch = self.fetch_cached
+        self.fetch16 = self.fetch16_cached
+
+    # the bus while a DMA runs, everything below HRAM and IO reads 0xFF and ignores writes. they put
+    # the normal bus back once the DMA is over
+    def read_dma(self, addr: int) -> int:
+        if self.cycles >= self.dma_end:
+            self.end_dma()
+        elif addr < 0xFF00:
+            self.ticks_per_instr += 1
+            self.cycles += 1
+            return 0xFF
+        return self.read_cartridge(addr)
+
+    def fetch16_dma(self, addr: int) -> int:
+        return self.read_dma(addr) | (self.read_dma((addr + 1) & 0xFFFF) << 8)
+
+    def write_dma(self, addr: int, value: int):
+        if self.cycles >= self.dma_end:
+            self.end_dma()
+        elif addr < 0xFF00:
+            self.ticks_per_instr += 1
+            self.cycles += 1
+            return
+        self.write_cartridge(addr, value)
 
     # sends data from our CPU to memory
-    def write(self, addr: int, value: int):
-        self.tick()
+    def write_cartridge(self, addr: int, value: int):
+        self.ticks_per_instr += 1
+        self.cycles += 1
+
+        if self.code_refs[addr]:
+            self.on_code_write(addr)
 
-        if self.testing:
-            self.memory[addr] = value
+        page = self.write_pages[addr >> 8]
+        if page is None:
+            self.write_decode(addr, value)
             return
+        page[addr & 0xFF] = value
 
+    def write_decode(self, addr: int, value: int):
         match addr >> 12:
             case 0x0 | 0x1 | 0x2 | 0x3 | 0x4 | 0x5 | 0x6 | 0x7:
-                self.rom[addr] = value
+                # the ROM can't be written to, this goes to the cartridge's bank registers
+                self.cartridge.write(addr, value)
+            case 0x8 | 0x9:
+                # the fetcher may not have read the old value yet
+                self.ppu.sync(self.cycles)
+                self.ppu.write_vram(addr - 0x8000, value)
+            case 0xA | 0xB:
+                self.cartridge.write_ram(addr, value)
             case 0xC | 0xD:
                 self.wram[addr - 0xC000] = value
             case 0xE:
@@ -100,38 +374,19 @@ class Memory:
                     # Nintendo says use of this area is prohibited.
                     pass
                 elif addr >= 0xFE00 and addr <= 0xFE9F:
-                    self.oam = value
+                    self.ppu.write_oam(addr - 0xFE00, value)
                 elif addr >= 0xFEA0 and addr <= 0xFEFF:
                     # Nintendo says use of this area is prohibited.
                     pass
                 elif addr >= 0xFF80 and addr <= 0xFFFE:
-                    self.hram = value
+                    self.hram[addr - 0xFF80] = value
+                elif addr == 0xFFFF:
+                    self.interrupts.write_IE(value)
                 else:
-                    # memory mapped IO + IE (interrupt enable register)
-                    match addr:
-                        case 0xFF07:
-                            self.timer.TAC = value
-                        case 0xFF0F:
-                            self.IF = value
-                        case 0xFF26:
-                            self.apu.NR52 = value
-                        case 0xFF25:
-                            self.apu.NR51 = value
-                        case 0xFF24:
-                            self.apu.NR50 = value
-                        case 0xFF40:
-                            self.ppu.LCDC = value
-                        case 0xFF42:
-                            self.ppu.SCY = value
-                        case 0xFF43:
-                            self.ppu.SCX = value
-                        case 0xFF47:
-                            self.ppu.BGP = value
-                        case 0xFFFF:
-                            self.IE = value
-                        case _:
-                            print("attempted to write to mmio register:", hex(addr))
-                            exit(1)
+                    # memory mapped IO
+                    # (everything is synced first so the cycles before the write still see the old value)
+                    self.sync()
+                    self.io_writes[addr & 0x7F](value)
             case _:
                 print("attempted to write to:", hex(addr))
                 exit(1)
\ No newline at end of file
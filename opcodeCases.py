@@ -1,7 +1,9 @@
-import nntplib
-from tkinter import E, N
 from memory import Memory
+from prefixedHandlers import PREFIXED_HANDLERS
+from interrupts import INT_JOYPAD, INT_ALL
 from typing import List
+from operator import and_, or_, xor
+from itertools import chain
 
 def i8(v: int) -> int:
 	return ((v & 0xFF) ^ 0x80) - 0x80
@@ -12,14 +14,70 @@ def u8(v: int) -> int:
 def u16(v):
 	return v & 0xFFFF
 
+# flag bits in the F register
+FLAG_Z = 0x80
+FLAG_N = 0x40
+FLAG_H = 0x20
+FLAG_C = 0x10
+
+# what the last INC/DEC left pending in flag_op (see opCodeTable.sync_flags)
+FLAGS_DONE = 0 # F is up to date
+FLAGS_INC = 3 # INC, carry is kept in F
+FLAGS_DEC = 4 # DEC, carry is kept in F
+
+def pack_flags(op: int, x: int, r: int, f: int) -> int:
+	# F for a pending flag record (op, x, r), f is the current F which INC/DEC take C from
+	z = 0 if r & 0xFF else FLAG_Z
+	n = FLAG_N if op == FLAGS_DEC else 0
+	h = FLAG_H if (x ^ r) & 0x10 else 0
+	return z | n | h | (f & FLAG_C)
+
+def alu_rows(op: str) -> List[List[int]]:
+	# (F << 8) | result of A <op> n for every (a, n, carry), a row (every n for one a and carry)
+	# at a time, working out all 131072 entries one by one is slow enough to notice at startup.
+	# the logic ops have no carry in, so they only have (a, n)
+	if op == "add":
+		# what a + n + c (0 - 511) packs to, minus the half carry which depends on the low nibbles
+		sums = [((FLAG_C if s > 0xFF else 0) | (0 if s & 0xFF else FLAG_Z)) << 8 | (s & 0xFF) for s in range(0x200)]
+		halves = [[FLAG_H << 8 if low + (n & 0xF) > 0xF else 0 for n in range(0x100)] for low in range(0x11)]
+		rows = [list(map(or_, sums[a + c:a + c + 0x100], halves[(a & 0xF) + c])) for c in (0, 1) for a in range(0x100)]
+	elif op == "sub":
+		# a - n - c + 0x100 (0 - 511), going down as n goes up
+		diffs = [(FLAG_N | (0 if s > 0xFF else FLAG_C) | (0 if s & 0xFF else FLAG_Z)) << 8 | (s & 0xFF) for s in range(0x200)]
+		halves = [[FLAG_H << 8 if low - (n & 0xF) < 0 else 0 for n in range(0x100)] for low in range(-1, 0x10)]
+		rows = [list(map(or_, diffs[a - c + 1:a - c + 0x101][::-1], halves[(a & 0xF) - c + 1])) for c in (0, 1) for a in range(0x100)]
+	else:
+		# the flags only depend on the result (and AND always sets H)
+		logic = {"and": and_, "xor": xor, "or": or_}[op]
+		h = FLAG_H << 8 if op == "and" else 0
+		results = [h | (0 if r else FLAG_Z << 8) | r for r in range(0x100)]
+		rows = [[results[logic(a, n)] for n in range(0x100)] for a in range(0x100)]
+	return rows
+
+def build_alu_tables() -> tuple:
+	# there are only a few thousand different (result, F) entries, every entry with the same one
+	# shares a single tuple
+	pairs = [(v & 0xFF, v >> 8) for v in range(0x10000)]
+	return tuple(list(map(pairs.__getitem__, chain.from_iterable(alu_rows(op)))) for op in ["add", "sub", "and", "xor", "or"])
+
+# every 8-bit ALU op (0x80 - 0xBF and the A, n forms) is a single lookup in one of these, indexed by
+# (carry << 16) | (a << 8) | n, the entry is (result, F). ADC/SBC put the C flag in the carry
+# bit ((f & FLAG_C) << 12), ADD/SUB leave it 0 and CP only keeps the flags of ALU_SUB. AND, XOR
+# and OR are only (a << 8) | n
+ALU_ADD, ALU_SUB, ALU_AND, ALU_XOR, ALU_OR = build_alu_tables()
+
 class opCodeTable:
 	def __init__(self, mem: Memory):
-		# 16-bit registers that are made up of two smaller 8-bit registers
-		# ex. AF = A(upper 8 bit register) + F(lower 8 bit register) = 16-bit register
-		self.AF = 0x0100
-		self.BC = 0x0013
-		self.DE = 0x00D8
-		self.HL = 0x014D
+		# 8-bit registers, stored separately so an instruction like LD A, B is a single assignment
+		# NOTE: lowercase so they don't clash with the H and C flags below
+		self.a = 0x01
+		self.f = 0xB0 # flags, see below
+		self.b = 0x00
+		self.c = 0x13
+		self.d = 0x00
+		self.e = 0xD8
+		self.h = 0x01
+		self.l = 0x4D
 		
 		# strictly 16-bit only
 		self.SP = 0xFFFE # stack pointer
@@ -27,1048 +85,151 @@ class opCodeTable:
 
 		# CPU Flags (used to perform conditional branching AKA if statements)
 		# NOTE: each represent 1 bit and together are the upper 4 bits of the F register
-		self.Z = 1 # zero flag
-		self.N = 0 # negative (AKA substract) flag
-		self.H = 1 # half-carry flag
-		self.C = 1 # carry flag
+		# Z - zero flag, N - negative (AKA substract) flag, H - half-carry flag, C - carry flag
+		#
+		# the 8-bit ALU ops look their flags up ready-made (see ALU_ADD), INC/DEC only record what
+		# they did and Z/N/H are worked out when a branch, PUSH AF, DAA, etc. actually read them
+		# (C is left alone by INC/DEC, so it is always up to date in F):
+		#   flag_op - FLAGS_* kind of the pending instruction (FLAGS_DONE when F is up to date)
+		#   flag_x - the operand xor'ed with 1 (half-carry is bit 4 of flag_x ^ flag_r)
+		#   flag_r - the result
+		self.flag_op = FLAGS_DONE
+		self.flag_x = 0
+		self.flag_r = 0
 
 		self.mem = mem
 
-		# interrupt master enable: if unset, interrupts absolutely cannot happen
-		self.ime = 0
+		# IF/IE/IME and the EI delay (see interrupts.py)
+		self.interrupts = mem.interrupts
 
-		# if set, delays setting ime by 1 M-Cycle
-		self.delayed_ime_enable = False
+		# set by HALT/STOP: PC is left on the opcode so it keeps getting executed (one fetch per
+		# M-cycle, like the real thing idling) until an interrupt it waits for is pending.
+		# wake_mask is the interrupts that count, all of them for HALT and only the joypad for STOP
+		self.halted = False
+		self.wake_mask = INT_ALL
 
-	def flag_bits(self) -> int:
-		return (self.Z << 7) | (self.N << 6) | (self.H << 5) | (self.C << 4)
 
-	def read_imm_u16(self):
-		lsb = self.mem.read(self.PC)
-		self.PC = u16(self.PC + 1)
-		msb = self.mem.read(self.PC)
-		self.PC = u16(self.PC + 1)
-		return (msb << 8) | lsb
+	# 16-bit registers that are made up of two smaller 8-bit registers
+	# ex. AF = A(upper 8 bit register) + F(lower 8 bit register) = 16-bit register
+	@property
+	def AF(self) -> int:
+		return (self.a << 8) | self.flag_bits()
 
-	def read_imm_u8(self):
-		byte = self.mem.read(self.PC)
-		self.PC = u16(self.PC + 1)
-		return byte
+	@AF.setter
+	def AF(self, v: int):
+		self.a = (v >> 8) & 0xFF
+		self.f = v & 0xF0 # the low 4 bits of F always read back as 0
+		self.flag_op = FLAGS_DONE
 
-	def execute_prefixed(self):
-		#prefixed table: 00-FF, no blanks
-		lst = self.mem.read(self.PC)
-		print(hex(lst))
-		self.PC = (self.PC + 1) & 0xFFFF
-		match lst:
-			case 0x00: #RLC B
-				self.BC = (u8((self.BC >> 8) << 1) << 8) | ((self.BC >> 15) << 8) | (self.BC & 0x00FF)
-				self.Z = (self.BC >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.BC >> 8) & 1
-			case 0x01: #RLC C
-				self.BC = (self.BC & 0xFF00) | ((self.BC << 1) & 0xFE) | (((self.BC << 1) >> 8) & 1)
-				self.Z = (self.BC & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = self.BC & 1
-			case 0x02: #RLC D
-				self.DE = (u8((self.DE >> 8) << 1) << 8) | ((self.DE >> 15) << 8) | (self.DE & 0x00FF)
-				self.Z = (self.DE >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.DE >> 8) & 1
-			case 0x03: #RLC E
-				self.DE = (self.DE & 0xFF00) | ((self.DE << 1) & 0xFE) | (((self.DE << 1) >> 8) & 1)
-				self.Z = (self.DE & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = self.DE & 1
-			case 0x04: #RLC H
-				self.HL = (u8((self.HL >> 8) << 1) << 8) | ((self.HL >> 15) << 8) | (self.HL & 0x00FF)
-				self.Z = (self.HL >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.HL >> 8) & 1
-			case 0x05: #RLC L
-				self.HL = (self.HL & 0xFF00) | ((self.HL << 1) & 0xFE) | (((self.HL << 1) >> 8) & 1)
-				self.Z = (self.HL & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = self.HL & 1
-			case 0x06: #RLC (HL) rotate memory contents
-				v = self.mem.read(self.HL)
-				v = u8(v << 1) | (v >> 7)
-				self.mem.write(self.HL, v)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 0
-				self.C = v & 1
-			case 0x07: #RLC A
-				self.AF = (u8((self.AF >> 8) << 1) << 8) | ((self.AF >> 15) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.AF >> 8) & 1
-			case 0x08: #RRC B
-				self.BC = (u8((self.BC >> 8) >> 1) << 8) | (u8((self.BC >> 8) << 7) << 8) | (self.BC & 0x00FF)
-				self.Z = (self.BC >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.BC >> 15) & 1
-			case 0x09: #RRC C
-				self.BC = (self.BC & 0xFF00) | ((self.BC >> 1) & 0x7F) | u8((self.BC & 0xFF) << 7)
-				self.Z = (self.BC & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.BC >> 7) & 1
-			case 0x0A: #RRC D
-				self.DE = (u8((self.DE >> 8) >> 1) << 8) | (u8((self.DE >> 8) << 7) << 8) | (self.DE & 0x00FF)
-				self.Z = (self.DE >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.DE >> 15) & 1
-			case 0x0B: #RRC E
-				self.DE = (self.DE & 0xFF00) | ((self.DE >> 1) & 0x7F) | u8((self.DE & 0xFF) << 7)
-				self.Z = (self.DE & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.DE >> 7) & 1
-			case 0x0C: #RRC H
-				self.HL = (u8((self.HL >> 8) >> 1) << 8) | (u8((self.HL >> 8) << 7) << 8) | (self.HL & 0x00FF)
-				self.Z = (self.HL >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.HL >> 15) & 1
-			case 0x0D: #RRC L
-				self.HL = (self.HL & 0xFF00) | ((self.HL >> 1) & 0x7F) | u8((self.HL & 0xFF) << 7)
-				self.Z = (self.HL & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.HL >> 7) & 1
-			case 0x0E: #RRC (HL)
-				v = self.mem.read(self.HL)
-				v = u8(v >> 1) | u8(v << 7)
-				self.mem.write(self.HL, v)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 0
-				self.C = (v >> 7) & 1
-			case 0x0F: #RRC A
-				self.AF = (u8((self.AF >> 8) >> 1) << 8) | (u8((self.AF >> 8) << 7) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.AF >> 15) & 1
+	@property
+	def BC(self) -> int:
+		return (self.b << 8) | self.c
 
-			case 0x10: #RL B
-				temp = self.C
-				self.C = (self.BC >> 15) & 1
-				self.BC = (((((self.BC >> 8) << 1) & 0xFF) | temp) << 8)  | (self.BC & 0x00FF)
-				self.Z = (self.BC >> 8) == 0
-				self.N = 0
-				self.H = 0
-			case 0x11: #RL C
-				temp = self.C
-				self.C = (self.BC >> 7) & 1
-				self.BC = (self.BC & 0xFF00) | ((self.BC << 1) & 0xFF)  | (((self.BC << 1) >> 8) & 1)
-				self.BC = ((self.BC >> 1) << 1) | temp
-				self.Z = (self.BC & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-			case 0x12: #RL D
-				temp = self.C
-				self.C = (self.DE >> 15) & 1
-				self.DE = (((((self.DE >> 8) << 1) & 0xFF) | temp) << 8)  | (self.DE & 0x00FF)
-				self.Z = (self.DE >> 8) == 0
-				self.N = 0
-				self.H = 0
-			case 0x13: #RL E
-				temp = self.C
-				self.C = (self.DE >> 7) & 1
-				self.DE = (self.DE & 0xFF00) | ((self.DE << 1) & 0xFF)  | (((self.DE << 1) >> 8) & 1)
-				self.DE = ((self.DE >> 1) << 1) | temp
-				self.Z = (self.DE & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-			case 0x14: #RL H
-				temp = self.C
-				self.C = (self.HL >> 15) & 1
-				self.HL = (((((self.HL >> 8) << 1) & 0xFF) | temp) << 8)  | (self.HL & 0x00FF)
-				self.Z = (self.HL >> 8) == 0
-				self.N = 0
-				self.H = 0
-			case 0x15: #RL L
-				temp = self.C
-				self.C = (self.HL >> 7) & 1
-				self.HL = (self.HL & 0xFF00) | ((self.HL << 1) & 0xFF)  | (((self.HL << 1) >> 8) & 1)
-				self.HL = ((self.HL >> 1) << 1) | temp
-				self.Z = (self.HL & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-			case 0x16: #RL (HL) rotate memory contents
-				v = self.mem.read(self.HL)
-				temp = self.C
-				self.C = (v >> 15) & 1
-				v = u8(v << 1) | (v >> 7)
-				v = ((v >> 1) << 1) | temp
-				self.mem.write(self.HL, v)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 0
-			case 0x17: #RL A
-				temp = self.C
-				self.C = (self.AF >> 15) & 1
-				self.AF = (((((self.AF >> 8) << 1) & 0xFF) | temp) << 8)  | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-			case 0x18: #RR B
-				temp = self.C
-				self.C = (self.BC >> 8) & 1
-				self.BC = (u8((self.BC >> 8) >> 1) << 8) | (u8((self.BC >> 8) << 7) << 8) | (self.BC & 0x00FF)
-				self.BC = (((u8((self.BC >> 8) << 1) >> 1) | (temp << 7)) << 8) | (self.BC & 0x00FF)
-				self.Z = (self.BC >> 8) == 0
-				self.N = 0
-				self.H = 0
-			case 0x19: #RR C
-				temp = self.C
-				self.C = self.BC & 1
-				self.BC = (self.BC & 0xFF00) | ((self.BC >> 1) & 0x7F) | (temp << 7)
-				self.Z = (self.BC & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-			case 0x1A: #RR D
-				temp = self.C
-				self.C = (self.DE >> 8) & 1
-				self.DE = (u8((self.DE >> 8) >> 1) << 8) | (u8((self.DE >> 8) << 7) << 8) | (self.DE & 0x00FF)
-				self.DE = (((u8((self.DE >> 8) << 1) >> 1) | (temp << 7)) << 8) | (self.DE & 0x00FF)
-				self.Z = (self.DE >> 8) == 0
-				self.N = 0
-				self.H = 0
-			case 0x1B: #RR E
-				temp = self.C
-				self.C = self.DE & 1
-				self.DE = (self.DE & 0xFF00) | ((self.DE >> 1) & 0x7F) | (temp << 7)
-				self.Z = (self.DE & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-			case 0x1C: #RR H
-				temp = self.C
-				self.C = (self.HL >> 8) & 1
-				self.HL = (u8((self.HL >> 8) >> 1) << 8) | (u8((self.HL >> 8) << 7) << 8) | (self.HL & 0x00FF)
-				self.HL = (((u8((self.HL >> 8) << 1) >> 1) | (temp << 7)) << 8) | (self.HL & 0x00FF)
-				self.Z = (self.HL >> 8) == 0
-				self.N = 0
-				self.H = 0
-			case 0x1D: #RR L
-				temp = self.C
-				self.C = self.HL & 1
-				self.HL = (self.HL & 0xFF00) | ((self.HL >> 1) & 0x7F) | (temp << 7)
-				self.Z = (self.HL & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-			case 0x1E: #RR (HL)
-				v = self.mem.read(self.HL)
-				temp = self.C
-				self.C = v & 1
-				v = u8(v >> 1) | temp << 7
-				self.mem.write(self.HL, v)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 0
-				self.C = (v >> 7) & 1
-			case 0x1F: #RR A
-				temp = self.C
-				self.C = (self.AF >> 8) & 1
-				self.AF = (u8((self.AF >> 8) >> 1) << 8) | (u8((self.AF >> 8) << 7) << 8) | (self.AF & 0x00FF)
-				self.AF = (((u8((self.AF >> 8) << 1) >> 1) | (temp << 7)) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
+	@BC.setter
+	def BC(self, v: int):
+		self.b = (v >> 8) & 0xFF
+		self.c = v & 0xFF
 
-			case 0x20: #SLA B
-				self.BC = (u8((self.BC >> 8) << 1) << 8) |  (self.BC & 0x00FF)
-				self.Z = (self.BC >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.BC >> 8) & 1
-			case 0x21: #SLA C
-				self.BC = (self.BC & 0xFF00) | ((self.BC << 1) & 0xFE)
-				self.Z = (self.BC & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = self.BC & 1
-			case 0x22: #SLA D
-				self.DE = (u8((self.DE >> 8) << 1) << 8) | (self.DE & 0x00FF)
-				self.Z = (self.DE >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.DE >> 8) & 1
-			case 0x23: #SLA E
-				self.DE = (self.DE & 0xFF00) | ((self.DE << 1) & 0xFE)
-				self.Z = (self.DE & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = self.DE & 1
-			case 0x24: #SLA H
-				self.HL = (u8((self.HL >> 8) << 1) << 8) | (self.HL & 0x00FF)
-				self.Z = (self.HL >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.HL >> 8) & 1
-			case 0x25: #SLA L
-				self.HL = (self.HL & 0xFF00) | ((self.HL << 1) & 0xFE)
-				#| (((self.HL << 1) >> 8) & 1)
-				self.Z = (self.HL & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = self.HL & 1
-			case 0x26: #SLA (HL) rotate memory contents
-				v = self.mem.read(self.HL)
-				v = u8(v << 1) 
-				#| (v >> 7)
-				self.mem.write(self.HL, v)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 0
-				self.C = v & 1
-			case 0x27: #SLA A
-				self.AF = (u8((self.AF >> 8) << 1) << 8) | (self.AF & 0x00FF)
-				#((self.AF >> 15) << 8) |
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.AF >> 8) & 1
-			case 0x28: #SLA B
-				#self.BC = (u8((self.BC >> 8) >> 1) << 8) | (u8((self.BC >> 8) << 7) << 8) | (self.BC & 0x00FF)
-				self.BC = (u8((self.BC >> 8) >> 1) << 8) | ((self.BC >> 15) << 15) | (self.BC & 0x00FF)
-				self.Z = (self.BC >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.BC >> 15) & 1
-			case 0x29: #SLA C
-				#self.BC = (self.BC & 0xFF00) | ((self.BC >> 1) & 0x7F) | u8((self.BC & 0xFF) << 7)
-				self.BC = (self.BC & 0xFF00) | ((self.BC >> 1) & 0x7F) | ((u8(self.BC & 0xFF) >> 7) << 7)
-				self.Z = (self.BC & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.BC >> 7) & 1
-			case 0x2A: #SLA D
-				self.DE = (u8((self.DE >> 8) >> 1) << 8) | ((self.DE >> 15) << 15) | (self.DE & 0x00FF)
-				self.Z = (self.DE >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.DE >> 15) & 1
-			case 0x2B: #SLA E
-				self.DE = (self.DE & 0xFF00) | ((self.DE >> 1) & 0x7F) | ((u8(self.DE & 0xFF) >> 7) << 7)
-				self.Z = (self.DE & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.DE >> 7) & 1
-			case 0x2C: #SLA H
-				self.HL = (u8((self.HL >> 8) >> 1) << 8) | ((self.HL >> 15) << 15) | (self.HL & 0x00FF)
-				self.Z = (self.HL >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.HL >> 15) & 1
-			case 0x2D: #SLA L
-				self.HL = (self.HL & 0xFF00) | ((self.HL >> 1) & 0x7F) | ((u8(self.HL & 0xFF) >> 7) << 7)
-				self.Z = (self.HL & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.HL >> 7) & 1
-			case 0x2E: #SLA (HL)
-				v = self.mem.read(self.HL)
-				#v = u8(v >> 1) | u8(v << 7)
-				v = u8(v >> 1) | u8((v >> 7) << 7)
-				self.mem.write(self.HL, v)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 0
-				self.C = (v >> 7) & 1
-			case 0x2F: #SLA A
-				self.AF = (u8((self.AF >> 8) >> 1) << 8) | ((self.AF >> 15) << 15) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.AF >> 15) & 1
+	@property
+	def DE(self) -> int:
+		return (self.d << 8) | self.e
 
-			case 0x30: #SWAP B first half of B is switched with last half and vice versa
-				#print("{:b}".format(self.BC >> 8))
-				#print("{:b}".format(u8((self.BC >> 8) << 4))) #rhalf
-				#print("{:b}".format(u8((self.BC >> 8) >> 4))) #lhalf
-				#print("{:b}".format((u8((self.BC >> 8) << 4) | u8((self.BC >> 8) >> 4)) << 8))
-				self.BC = ((u8((self.BC >> 8) << 4) | u8((self.BC >> 8) >> 4)) << 8) | (self.BC & 0x00FF)
-				self.Z = (self.BC >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0#(self.BC >> 8) & 1
-			case 0x31: #SWAP C
-				self.BC = (self.BC & 0xFF00) | ((u8((self.BC & 0xFF) << 4) | u8((self.BC & 0xFF) >> 4)))
-				self.Z = (self.BC & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0#self.BC & 1
-			case 0x32: #SWAP D
-				self.DE = ((u8((self.DE >> 8) << 4) | u8((self.DE >> 8) >> 4)) << 8) | (self.DE & 0x00FF)
-				self.Z = (self.DE >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0#(self.BC >> 8) & 1
-			case 0x33: #SWAP E
-				self.DE = (self.DE & 0xFF00) | ((u8((self.DE & 0xFF) << 4) | u8((self.DE & 0xFF) >> 4)))
-				self.Z = (self.DE & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0#self.BC & 1
-			case 0x34: #SWAP H
-				self.HL = ((u8((self.HL >> 8) << 4) | u8((self.HL >> 8) >> 4)) << 8) | (self.HL & 0x00FF)
-				self.Z = (self.HL >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0#(self.BC >> 8) & 1
-			case 0x35: #SWAP L
-				self.HL = (self.HL & 0xFF00) | ((u8((self.HL & 0xFF) << 4) | u8((self.HL & 0xFF) >> 4)))
-				self.Z = (self.HL & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0#self.BC & 1
-			case 0x36: #SWAP (HL)
-				v = self.mem.read(self.HL)
-				v = u8(v << 4) | (v >> 4)
-				self.mem.write(self.HL, v)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0#v & 1
-			case 0x37: #SWAP A
-				self.AF = ((u8((self.AF >> 8) << 4) | u8((self.AF >> 8) >> 4)) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0#(self.BC >> 8) & 1
-			case 0x38: #SRL B
-				self.BC = (u8((self.BC >> 8) >> 1) << 8) | (self.BC & 0x00FF)
-				#| (u8((self.BC >> 8) << 7) << 8)
-				self.Z = (self.BC >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.BC >> 15) & 1
-			case 0x39: #SRL C
-				self.BC = (self.BC & 0xFF00) | ((self.BC >> 1) & 0x7F)# | u8((self.BC & 0xFF) << 7)
-				self.Z = (self.BC & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.BC >> 7) & 1
-			case 0x3A: #SRL D
-				self.DE = (u8((self.DE >> 8) >> 1) << 8) | (self.DE & 0x00FF)
-				self.Z = (self.DE >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.DE >> 15) & 1
-			case 0x3B: #SRL E
-				self.DE = (self.DE & 0xFF00) | ((self.DE >> 1) & 0x7F)
-				self.Z = (self.DE & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.DE >> 7) & 1
-			case 0x3C: #SRL H
-				self.HL = (u8((self.HL >> 8) >> 1) << 8) | (self.HL & 0x00FF)
-				self.Z = (self.HL >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.HL >> 15) & 1
-			case 0x3D: #SRL L
-				self.HL = (self.HL & 0xFF00) | ((self.HL >> 1) & 0x7F)
-				self.Z = (self.HL & 0xFF) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.HL >> 7) & 1
-			case 0x3E: #SRL (HL)
-				v = self.mem.read(self.HL)
-				v = u8(v >> 1)# | u8(v << 7)
-				self.mem.write(self.HL, v)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 0
-				self.C = (v >> 7) & 1
-			case 0x3F: #SRL A
-				self.AF = (u8((self.AF >> 8) >> 1) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = (self.AF >> 15) & 1
+	@DE.setter
+	def DE(self, v: int):
+		self.d = (v >> 8) & 0xFF
+		self.e = v & 0xFF
 
-			case 0x40:# 40-7f: Bit 0-7, all registers
-				self.Z = (self.BC >> 8) & 1
-				self.N = 0
-				self.H = 0
-			case 0x41:
-				self.Z = (self.BC & 0xFF) & 1
-				self.N = 0
-				self.H = 0
-			case 0x42:
-				self.Z = (self.DE >> 8) & 1
-				self.N = 0
-				self.H = 0
-			case 0x43:
-				self.Z = (self.DE & 0xFF) & 1
-				self.N = 0
-				self.H = 0
-			case 0x44:
-				self.Z = (self.HL >> 8) & 1
-				self.N = 0
-				self.H = 0
-			case 0x45:
-				self.Z = (self.HL & 0xFF) & 1
-				self.N = 0
-				self.H = 0
-			case 0x46:
-				v = self.mem.read(self.HL)
-				self.Z = v & 1
-				self.N = 0
-				self.H = 0
-			case 0x47:
-				self.Z = (self.AF >> 8) & 1
-				self.N = 0
-				self.H = 0
-			case 0x48:
-				self.Z = (self.BC >> 8 >> 1) & 1
-				self.N = 0
-				self.H = 0
-			case 0x49:
-				self.Z = (self.BC & 0xFF >> 1) & 1
-				self.N = 0
-				self.H = 0
-			case 0x4a:
-				self.Z = (self.DE >> 8 >> 1) & 1
-				self.N = 0
-				self.H = 0
-			case 0x4b:
-				self.Z = (self.DE & 0xFF >> 1) & 1
-				self.N = 0
-				self.H = 0
-			case 0x4c:
-				self.Z = (self.HL >> 8 >> 1) & 1
-				self.N = 0
-				self.H = 0
-			case 0x4d:
-				self.Z = (self.HL & 0xFF >> 1) & 1
-				self.N = 0
-				self.H = 0
-			case 0x4e:
-				v = self.mem.read(self.HL)
-				self.Z = (v >> 1) & 1
-				self.N = 0
-				self.H = 0
-			case 0x4f:
-				self.Z = (self.AF >> 8 >> 1) & 1
-				self.N = 0
-				self.H = 0
-			
-			case 0x50:
-				self.Z = (self.BC >> 8 >> 2) & 1
-				self.N = 0
-				self.H = 0
-			case 0x51:
-				self.Z = (self.BC & 0xFF >> 2) & 1
-				self.N = 0
-				self.H = 0
-			case 0x52:
-				self.Z = (self.DE >> 8 >> 2) & 1
-				self.N = 0
-				self.H = 0
-			case 0x53:
-				self.Z = (self.DE & 0xFF >> 2) & 1
-				self.N = 0
-				self.H = 0
-			case 0x54:
-				self.Z = (self.HL >> 8 >> 2) & 1
-				self.N = 0
-				self.H = 0
-			case 0x55:
-				self.Z = (self.HL & 0xFF >> 2) & 1
-				self.N = 0
-				self.H = 0
-			case 0x56:
-				v = self.mem.read(self.HL)
-				self.Z = (v >> 2) & 1
-				self.N = 0
-				self.H = 0
-			case 0x57:
-				self.Z = (self.AF >> 8 >> 2) & 1
-				self.N = 0
-				self.H = 0
-			case 0x58:
-				self.Z = (self.BC >> 8 >> 3) & 1
-				self.N = 0
-				self.H = 0
-			case 0x59:
-				self.Z = (self.BC & 0xFF >> 3) & 1
-				self.N = 0
-				self.H = 0
-			case 0x5a:
-				self.Z = (self.DE >> 8 >> 3) & 1
-				self.N = 0
-				self.H = 0
-			case 0x5b:
-				self.Z = (self.DE & 0xFF >> 3) & 1
-				self.N = 0
-				self.H = 0
-			case 0x5c:
-				self.Z = (self.HL >> 8 >> 3) & 1
-				self.N = 0
-				self.H = 0
-			case 0x5d:
-				self.Z = (self.HL & 0xFF >> 3) & 1
-				self.N = 0
-				self.H = 0
-			case 0x5e:
-				v = self.mem.read(self.HL)
-				self.Z = (v >> 3) & 1
-				self.N = 0
-				self.H = 0
-			case 0x5f:
-				self.Z = (self.AF >> 8 >> 3) & 1
-				self.N = 0
-				self.H = 0
-			
-			case 0x60:
-				self.Z = (self.BC >> 8 >> 4) & 1
-				self.N = 0
-				self.H = 0
-			case 0x61:
-				self.Z = (self.BC & 0xFF >> 4) & 1
-				self.N = 0
-				self.H = 0
-			case 0x62:
-				self.Z = (self.DE >> 8 >> 4) & 1
-				self.N = 0
-				self.H = 0
-			case 0x63:
-				self.Z = (self.DE & 0xFF >> 4) & 1
-				self.N = 0
-				self.H = 0
-			case 0x64:
-				self.Z = (self.HL >> 8 >> 4) & 1
-				self.N = 0
-				self.H = 0
-			case 0x65:
-				self.Z = (self.HL & 0xFF >> 4) & 1
-				self.N = 0
-				self.H = 0
-			case 0x66:
-				v = self.mem.read(self.HL)
-				self.Z = (v >> 4) & 1
-				self.N = 0
-				self.H = 0
-			case 0x67:
-				self.Z = (self.AF >> 8 >> 4) & 1
-				self.N = 0
-				self.H = 0
-			case 0x68:
-				self.Z = (self.BC >> 8 >> 5) & 1
-				self.N = 0
-				self.H = 0
-			case 0x69:
-				self.Z = (self.BC & 0xFF >> 5) & 1
-				self.N = 0
-				self.H = 0
-			case 0x6a:
-				self.Z = (self.DE >> 8 >> 5) & 1
-				self.N = 0
-				self.H = 0
-			case 0x6b:
-				self.Z = (self.DE & 0xFF >> 5) & 1
-				self.N = 0
-				self.H = 0
-			case 0x6c:
-				self.Z = (self.HL >> 8 >> 5) & 1
-				self.N = 0
-				self.H = 0
-			case 0x6d:
-				self.Z = (self.HL & 0xFF >> 5) & 1
-				self.N = 0
-				self.H = 0
-			case 0x6e:
-				v = self.mem.read(self.HL)
-				self.Z = (v >> 5) & 1
-				self.N = 0
-				self.H = 0
-			case 0x6f:
-				self.Z = (self.AF >> 8 >> 5) & 1
-				self.N = 0
-				self.H = 0
-			
-			case 0x70:
-				self.Z = (self.BC >> 8 >> 6) & 1
-				self.N = 0
-				self.H = 0
-			case 0x71:
-				self.Z = (self.BC & 0xFF >> 6) & 1
-				self.N = 0
-				self.H = 0
-			case 0x72:
-				self.Z = (self.DE >> 8 >> 6) & 1
-				self.N = 0
-				self.H = 0
-			case 0x73:
-				self.Z = (self.DE & 0xFF >> 6) & 1
-				self.N = 0
-				self.H = 0
-			case 0x74:
-				self.Z = (self.HL >> 8 >> 6) & 1
-				self.N = 0
-				self.H = 0
-			case 0x75:
-				self.Z = (self.HL & 0xFF >> 6) & 1
-				self.N = 0
-				self.H = 0
-			case 0x76:
-				v = self.mem.read(self.HL)
-				self.Z = (v >> 6) & 1
-				self.N = 0
-				self.H = 0
-			case 0x77:
-				self.Z = (self.AF >> 8 >> 6) & 1
-				self.N = 0
-				self.H = 0
-			case 0x78:
-				self.Z = (self.BC >> 8 >> 7) & 1
-				self.N = 0
-				self.H = 0
-			case 0x79:
-				self.Z = (self.BC & 0xFF >> 7) & 1
-				self.N = 0
-				self.H = 0
-			case 0x7a:
-				self.Z = (self.DE >> 8 >> 7) & 1
-				self.N = 0
-				self.H = 0
-			case 0x7b:
-				self.Z = (self.DE & 0xFF >> 7) & 1
-				self.N = 0
-				self.H = 0
-			case 0x7c:
-				self.Z = (self.HL >> 8 >> 7) & 1
-				self.N = 0
-				self.H = 0
-			case 0x7d:
-				self.Z = (self.HL & 0xFF >> 7) & 1
-				self.N = 0
-				self.H = 0
-			case 0x7e:
-				v = self.mem.read(self.HL)
-				self.Z = (v >> 7) & 1
-				self.N = 0
-				self.H = 0
-			case 0x7f:
-				self.Z = (self.AF >> 8 >> 7) & 1
-				self.N = 0
-				self.H = 0
+	@property
+	def HL(self) -> int:
+		return (self.h << 8) | self.l
+
+	@HL.setter
+	def HL(self, v: int):
+		self.h = (v >> 8) & 0xFF
+		self.l = v & 0xFF
+
+	def sync_flags(self):
+		# works out Z/N/H/C for the pending instruction and stores them in F
+		if self.flag_op == FLAGS_DONE:
+			return
+		self.f = pack_flags(self.flag_op, self.flag_x, self.flag_r, self.f)
+		self.flag_op = FLAGS_DONE
+
+	def flag_bits(self) -> int:
+		if self.flag_op:
+			self.sync_flags()
+		return self.f
+
+	# single flags, read without bringing F up to date (branches only need one of them)
+	@property
+	def Z(self) -> int:
+		if self.flag_op:
+			return int(not self.flag_r & 0xFF)
+		return self.f >> 7
+
+	@property
+	def N(self) -> int:
+		if self.flag_op:
+			return int(self.flag_op == FLAGS_DEC)
+		return (self.f >> 6) & 1
 
-			case 0x80: #80-BF RES bit 0-7, all registers
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) & ~(1 << 0)) << 8)
-			case 0x81:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) & ~(1 << 0))
-			case 0x82:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) & ~(1 << 0)) << 8)
-			case 0x83:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) & ~(1 << 0))  
-			case 0x84:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) & ~(1 << 0)) << 8)   
-			case 0x85:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) & ~(1 << 0))    
-			case 0x86:
-				v = self.mem.read(self.HL)
-				v &= ~(1 << 0)
-				self.mem.write(self.HL, v)
-			case 0x87:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) & ~(1 << 0)) << 8)
-			case 0x88:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) & ~(1 << 1)) << 8)
-			case 0x89:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) & ~(1 << 1))
-			case 0x8a:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) & ~(1 << 1)) << 8)
-			case 0x8b:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) & ~(1 << 1)) 
-			case 0x8c:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) & ~(1 << 1)) << 8)
-			case 0x8d:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) & ~(1 << 1)) 
-			case 0x8e:
-				v = self.mem.read(self.HL)
-				v &= ~(1 << 1)
-				self.mem.write(self.HL, v)
-			case 0x8f:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) & ~(1 << 1)) << 8)
-			
-			case 0x90:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) & ~(1 << 2)) << 8)
-			case 0x91:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) & ~(1 << 2))
-			case 0x92:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) & ~(1 << 2)) << 8)
-			case 0x93:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) & ~(1 << 2))  
-			case 0x94:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) & ~(1 << 2)) << 8)   
-			case 0x95:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) & ~(1 << 2))    
-			case 0x96:
-				v = self.mem.read(self.HL)
-				v &= ~(1 << 2)
-				self.mem.write(self.HL, v)
-			case 0x97:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) & ~(1 << 2)) << 8)
-			case 0x98:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) & ~(1 << 3)) << 8)
-			case 0x99:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) & ~(1 << 3))
-			case 0x9a:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) & ~(1 << 3)) << 8)
-			case 0x9b:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) & ~(1 << 3)) 
-			case 0x9c:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) & ~(1 << 3)) << 8)
-			case 0x9d:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) & ~(1 << 3)) 
-			case 0x9e:
-				v = self.mem.read(self.HL)
-				v &= ~(1 << 3)
-				self.mem.write(self.HL, v)
-			case 0x9f:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) & ~(1 << 3)) << 8)
-			
-			case 0xa0:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) & ~(1 << 4)) << 8)
-			case 0xa1:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) & ~(1 << 4))
-			case 0xa2:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) & ~(1 << 4)) << 8)
-			case 0xa3:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) & ~(1 << 4))  
-			case 0xa4:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) & ~(1 << 4)) << 8)   
-			case 0xa5:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) & ~(1 << 4))    
-			case 0xa6:
-				v = self.mem.read(self.HL)
-				v &= ~(1 << 4)
-				self.mem.write(self.HL, v)
-			case 0xa7:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) & ~(1 << 4)) << 8)
-			case 0xa8:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) & ~(1 << 5)) << 8)
-			case 0xa9:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) & ~(1 << 5))
-			case 0xaa:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) & ~(1 << 5)) << 8)
-			case 0xab:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) & ~(1 << 5)) 
-			case 0xac:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) & ~(1 << 5)) << 8)
-			case 0xad:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) & ~(1 << 5)) 
-			case 0xae:
-				v = self.mem.read(self.HL)
-				v &= ~(1 << 5)
-				self.mem.write(self.HL, v)
-			case 0xaf:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) & ~(1 << 5)) << 8)
-				
-			case 0xb0:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) & ~(1 << 6)) << 8)
-			case 0xb1:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) & ~(1 << 6))
-			case 0xb2:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) & ~(1 << 6)) << 8)
-			case 0xb3:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) & ~(1 << 6))  
-			case 0xb4:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) & ~(1 << 6)) << 8)   
-			case 0xb5:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) & ~(1 << 6))    
-			case 0xb6:
-				v = self.mem.read(self.HL)
-				v &= ~(1 << 6)
-				self.mem.write(self.HL, v)
-			case 0xb7:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) & ~(1 << 6)) << 8)
-			case 0xb8:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) & ~(1 << 7)) << 8)
-			case 0xb9:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) & ~(1 << 7))
-			case 0xba:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) & ~(1 << 7)) << 8)
-			case 0xbb:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) & ~(1 << 7)) 
-			case 0xbc:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) & ~(1 << 7)) << 8)
-			case 0xbd:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) & ~(1 << 7)) 
-			case 0xbe:
-				v = self.mem.read(self.HL)
-				v &= ~(1 << 7)
-				self.mem.write(self.HL, v)
-			case 0xbf:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) & ~(1 << 7)) << 8)
+	@property
+	def H(self) -> int:
+		if self.flag_op:
+			return ((self.flag_x ^ self.flag_r) >> 4) & 1
+		return (self.f >> 5) & 1
 
-			case 0xc0:#C0-FF SET bit 0-7, all registers
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) | (1 << 0)) << 8)
-			case 0xc1:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) | (1 << 0))
-			case 0xc2:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) | (1 << 0)) << 8)
-			case 0xc3:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) | (1 << 0))  
-			case 0xc4:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) | (1 << 0)) << 8)   
-			case 0xc5:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) | (1 << 0))    
-			case 0xc6:
-				v = self.mem.read(self.HL)
-				v |= (1 << 0)
-				self.mem.write(self.HL, v)
-			case 0xc7:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) | (1 << 0)) << 8)
-			case 0xc8:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) | (1 << 1)) << 8)
-			case 0xc9:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) | (1 << 1))
-			case 0xca:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) | (1 << 1)) << 8)
-			case 0xcb:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) | (1 << 1)) 
-			case 0xcc:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) | (1 << 1)) << 8)
-			case 0xcd:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) | (1 << 1)) 
-			case 0xce:
-				v = self.mem.read(self.HL)
-				v |= (1 << 1)
-				self.mem.write(self.HL, v)
-			case 0xcf:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) | (1 << 1)) << 8)
-			
-			case 0xd0:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) | (1 << 2)) << 8)
-			case 0xd1:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) | (1 << 2))
-			case 0xd2:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) | (1 << 2)) << 8)
-			case 0xd3:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) | (1 << 2))  
-			case 0xd4:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) | (1 << 2)) << 8)   
-			case 0xd5:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) | (1 << 2))    
-			case 0xd6:
-				v = self.mem.read(self.HL)
-				v |= (1 << 2)
-				self.mem.write(self.HL, v)
-			case 0xd7:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) | (1 << 2)) << 8)
-			case 0xd8:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) | (1 << 3)) << 8)
-			case 0xd9:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) | (1 << 3))
-			case 0xda:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) | (1 << 3)) << 8)
-			case 0xdb:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) | (1 << 3)) 
-			case 0xdc:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) | (1 << 3)) << 8)
-			case 0xdd:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) | (1 << 3)) 
-			case 0xde:
-				v = self.mem.read(self.HL)
-				v |= (1 << 3)
-				self.mem.write(self.HL, v)
-			case 0xdf:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) | (1 << 3)) << 8)
-			
-			case 0xe0:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) | (1 << 4)) << 8)
-			case 0xe1:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) | (1 << 4))
-			case 0xe2:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) | (1 << 4)) << 8)
-			case 0xe3:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) | (1 << 4))  
-			case 0xe4:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) | (1 << 4)) << 8)   
-			case 0xe5:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) | (1 << 4))    
-			case 0xe6:
-				v = self.mem.read(self.HL)
-				v |= (1 << 4)
-				self.mem.write(self.HL, v)
-			case 0xe7:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) | (1 << 4)) << 8)
-			case 0xe8:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) | (1 << 5)) << 8)
-			case 0xe9:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) | (1 << 5))
-			case 0xea:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) | (1 << 5)) << 8)
-			case 0xeb:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) | (1 << 5)) 
-			case 0xec:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) | (1 << 5)) << 8)
-			case 0xed:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) | (1 << 5)) 
-			case 0xee:
-				v = self.mem.read(self.HL)
-				v |= (1 << 5)
-				self.mem.write(self.HL, v)
-			case 0xef:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) | (1 << 5)) << 8)
-				
-			case 0xf0:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) | (1 << 6)) << 8)
-			case 0xf1:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) | (1 << 6))
-			case 0xf2:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) | (1 << 6)) << 8)
-			case 0xf3:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) | (1 << 6))  
-			case 0xf4:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) | (1 << 6)) << 8)   
-			case 0xf5:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) | (1 << 6))    
-			case 0xf6:
-				v = self.mem.read(self.HL)
-				v |= (1 << 6)
-				self.mem.write(self.HL, v)
-			case 0xf7:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) | (1 << 6)) << 8)
-			case 0xf8:
-				self.BC = (self.BC & 0x00FF) | ((u8(self.BC >> 8) | (1 << 7)) << 8)
-			case 0xf9:
-				self.BC = (self.BC & 0xFF00) | ((self.BC & 0xFF) | (1 << 7))
-			case 0xfa:
-				self.DE = (self.DE & 0x00FF) | ((u8(self.DE >> 8) | (1 << 7)) << 8)
-			case 0xfb:
-				self.DE = (self.DE & 0xFF00) | ((self.DE & 0xFF) | (1 << 7)) 
-			case 0xfc:
-				self.HL = (self.HL & 0x00FF) | ((u8(self.HL >> 8) | (1 << 7)) << 8)
-			case 0xfd:
-				self.HL = (self.HL & 0xFF00) | ((self.HL & 0xFF) | (1 << 7)) 
-			case 0xfe:
-				v = self.mem.read(self.HL)
-				v |= (1 << 7)
-				self.mem.write(self.HL, v)
-			case 0xff:
-				self.AF = (self.AF & 0x00FF) | ((u8(self.AF >> 8) | (1 << 7)) << 8)
+	@property
+	def C(self) -> int:
+		return (self.f >> 4) & 1
+
+	@Z.setter
+	def Z(self, v: int):
+		self.set_flag(FLAG_Z, v)
+
+	@N.setter
+	def N(self, v: int):
+		self.set_flag(FLAG_N, v)
+
+	@H.setter
+	def H(self, v: int):
+		self.set_flag(FLAG_H, v)
+
+	@C.setter
+	def C(self, v: int):
+		self.set_flag(FLAG_C, v)
+
+	def set_flag(self, bit: int, v: int):
+		f = self.flag_bits()
+		self.f = (f | bit) if v else (f & ~bit)
+
+	def alu(self, table: List[tuple], n: int, carry: int = 0):
+		# A = A <op> n for one of the ALU_* tables, the flags come with it
+		self.flag_op = FLAGS_DONE
+		self.a, self.f = table[(carry << 16) | (self.a << 8) | n]
+
+	def compare(self, n: int):
+		# CP, a SUB that only keeps the flags
+		self.flag_op = FLAGS_DONE
+		self.f = ALU_SUB[(self.a << 8) | n][1]
+
+	# operands are read through Memory.fetch/fetch16 (the instruction fetch fast path)
+	def read_imm_u16(self):
+		pc = self.PC
+		self.PC = (pc + 2) & 0xFFFF
+		return self.mem.fetch16(pc)
+
+	def read_imm_u8(self):
+		pc = self.PC
+		self.PC = (pc + 1) & 0xFFFF
+		return self.mem.fetch(pc)
+
+	def execute_prefixed(self):
+		#prefixed table: 00-FF, no blanks (handlers are generated in prefixedHandlers.py)
+		lst = self.mem.fetch(self.PC)
+		self.PC = (self.PC + 1) & 0xFFFF
+		PREFIXED_HANDLERS[lst](self)
 
-			case _:
-				print("no code :(")
-				exit(1)
-		
 	def tableLookup(self, code: int):
 		match code:
 			case 0xCB:
@@ -1144,7 +305,14 @@ class opCodeTable:
 				self.H = 0
 
 			case 0x10: #STOP
-				exit(1)
+				# treated as a HALT that only a joypad interrupt wakes up
+				self.read_imm_u8()
+				self.wake_mask = INT_JOYPAD
+				if self.interrupts.requested & self.wake_mask:
+					self.halted = False
+				else:
+					self.halted = True
+					self.PC = u16(self.PC - 2)
 			case 0x11: #load immediate 2-bytes to DE
 				nn = self.read_imm_u16()
 				self.DE = nn
@@ -1496,7 +664,13 @@ class opCodeTable:
 				self.mem.write(self.HL, self.HL & 0xFF)
 			case 0x76:
 				#HALT
-				exit(1)
+				self.wake_mask = INT_ALL
+				if self.interrupts.requested:
+					# an interrupt is pending, carry on (the HALT bug isn't emulated)
+					self.halted = False
+				else:
+					self.halted = True
+					self.PC = u16(self.PC - 1)
 			case 0x77: # LD (HL), A
 				self.mem.write(self.HL, self.AF >> 8)
 			case 0x78: # LD A, B
@@ -1518,436 +692,144 @@ class opCodeTable:
 				pass
 
 			case 0x80: # ADD A, B
-				v = u8((self.AF >> 8) + (self.BC >> 8))
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.BC >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.BC >> 8)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.BC >> 8)
 			case 0x81: # ADD A, C
-				v = u8((self.AF >> 8) + (self.BC & 0xFF))
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.BC & 0xFF) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.BC & 0xFF)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.BC & 0xFF)
 			case 0x82: # ADD A, D
-				v = u8((self.AF >> 8) + (self.DE >> 8))
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.DE >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.DE >> 8)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.DE >> 8)
 			case 0x83: # ADD A, E
-				v = u8((self.AF >> 8) + (self.DE & 0xFF))
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.DE & 0xFF) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.DE & 0xFF)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.DE & 0xFF)
 			case 0x84: # ADD A, H
-				v = u8((self.AF >> 8) + (self.HL >> 8))
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.HL >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.HL >> 8)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.HL >> 8)
 			case 0x85: # ADD A, L
-				v = u8((self.AF >> 8) + (self.HL & 0xFF))
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.HL & 0xFF) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.HL & 0xFF)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.HL & 0xFF)
 			case 0x86: # ADD A, (HL)
 				n = self.mem.read(self.HL)
-				v = u8((self.AF >> 8) + n)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + (n & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + n) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, n)
 			case 0x87: # ADD A, A
-				v = u8((self.AF >> 8) + (self.AF >> 8))
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.AF >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.AF >> 8)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.AF >> 8)
 			case 0x88: # ADC A, B
-				v = u8((self.AF >> 8) + (self.BC >> 8) + self.C)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.BC >> 8) & 0xF) + self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.BC >> 8) + self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.BC >> 8, self.C)
 			case 0x89: # ADC A, C
-				v = u8((self.AF >> 8) + (self.BC & 0xFF) + self.C)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + (self.BC & 0xF) + self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.BC & 0xFF) + self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.BC & 0xFF, self.C)
 			case 0x8A: # ADC A, D
-				v = u8((self.AF >> 8) + (self.DE >> 8) + self.C)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.DE >> 8) & 0xF) + self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.DE >> 8) + self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.DE >> 8, self.C)
 			case 0x8B: # ADC A, E
-				v = u8((self.AF >> 8) + (self.DE & 0xFF) + self.C)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + (self.DE & 0xF) + self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.DE & 0xFF) + self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.DE & 0xFF, self.C)
 			case 0x8C: # ADC A, H
-				v = u8((self.AF >> 8) + (self.HL >> 8) + self.C)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.HL >> 8) & 0xF) + self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.HL >> 8) + self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.HL >> 8, self.C)
 			case 0x8D: # ADC A, L
-				v = u8((self.AF >> 8) + (self.HL & 0xFF) + self.C)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + (self.HL & 0xF) + self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.HL & 0xFF) + self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.HL & 0xFF, self.C)
 			case 0x8E: # ADC A, (HL)
 				n = self.mem.read(self.HL)
-				v = u8((self.AF >> 8) + n + self.C)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + (n & 0xF) + self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + n + self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, n, self.C)
 			case 0x8F: # ADC A, A
-				v = u8((self.AF >> 8) + (self.AF >> 8) + self.C)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + ((self.AF >> 8) & 0xF) + self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + (self.AF >> 8) + self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, self.AF >> 8, self.C)
 
 			case 0x90: # SUB A, B
-				v = u8((self.AF >> 8) - (self.BC >> 8))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.BC >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.BC >> 8)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.BC >> 8)
 			case 0x91: # SUB A, C
-				v = u8((self.AF >> 8) - (self.BC & 0xFF))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.BC & 0xFF) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.BC & 0xFF)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.BC & 0xFF)
 			case 0x92: # SUB A, D
-				v = u8((self.AF >> 8) - (self.DE >> 8))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.DE >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.DE >> 8)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.DE >> 8)
 			case 0x93: # SUB A, E
-				v = u8((self.AF >> 8) - (self.DE & 0xFF))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.DE & 0xFF) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.DE & 0xFF)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.DE & 0xFF)
 			case 0x94: # SUB A, H
-				v = u8((self.AF >> 8) - (self.HL >> 8))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.HL >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.HL >> 8)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.HL >> 8)
 			case 0x95: # SUB A, L
-				v = u8((self.AF >> 8) - (self.HL & 0xFF))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.HL & 0xFF) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.HL & 0xFF)) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.HL & 0xFF)
 			case 0x96: # SUB A, (HL)
 				n = self.mem.read(self.HL)
-				v = u8((self.AF >> 8) - n)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - (n & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - n) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, n)
 			case 0x97: # SUB A, A
-				self.AF = self.AF & 0x00FF
-				self.Z = 1
-				self.N = 1
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_SUB, self.AF >> 8)
 			case 0x98: # SBC A, B
-				v = u8((self.AF >> 8) - (self.BC >> 8) - self.C)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.BC >> 8) & 0xF) - self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.BC >> 8) - self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.BC >> 8, self.C)
 			case 0x99: # SBC A, C
-				v = u8((self.AF >> 8) - (self.BC & 0xFF) - self.C)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.BC & 0xFF) & 0xF) - self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.BC & 0xFF) - self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.BC & 0xFF, self.C)
 			case 0x9A: # SBC A, D
-				v = u8((self.AF >> 8) - (self.DE >> 8) - self.C)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.DE >> 8) & 0xF) - self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.DE >> 8) - self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.DE >> 8, self.C)
 			case 0x9B: # SBC A, E
-				v = u8((self.AF >> 8) - (self.DE & 0xFF) - self.C)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.DE & 0xFF) & 0xF) - self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.DE & 0xFF) - self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.DE & 0xFF, self.C)
 			case 0x9C: # SBC A, H
-				v = u8((self.AF >> 8) - (self.HL >> 8) - self.C)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.HL >> 8) & 0xF) - self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.HL >> 8) - self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.HL >> 8, self.C)
 			case 0x9D: # SBC A, L
-				v = u8((self.AF >> 8) - (self.HL & 0xFF) - self.C)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.HL & 0xFF) & 0xF) - self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.HL & 0xFF) - self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.HL & 0xFF, self.C)
 			case 0x9E: # SBC A, (HL)
 				n = self.mem.read(self.HL)
-				v = u8((self.AF >> 8) - n - self.C)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - (n & 0xF) - self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - n - self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, n, self.C)
 			case 0x9F: # SBC A, A
-				v = u8((self.AF >> 8) - (self.AF >> 8) - self.C)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.AF >> 8) & 0xF) - self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.AF >> 8) - self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, self.AF >> 8, self.C)
 
 			case 0xA0: # AND A, B
-				v = ((self.AF >> 8) & (self.BC >> 8))
-				self.AF = (v << 8) | (self.AF & 0x00FF)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 1
-				self.C = 0
+				self.alu(ALU_AND, self.BC >> 8)
 			case 0xA1: # AND A, C
-				v = ((self.AF >> 8) & (self.BC & 0xFF))
-				self.AF = (v << 8) | (self.AF & 0x00FF)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 1
-				self.C = 0
+				self.alu(ALU_AND, self.BC & 0xFF)
 			case 0xA2: # AND A, D
-				v = ((self.AF >> 8) & (self.DE >> 8))
-				self.AF = (v << 8) | (self.AF & 0x00FF)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 1
-				self.C = 0
+				self.alu(ALU_AND, self.DE >> 8)
 			case 0xA3: # AND A, E
-				v = ((self.AF >> 8) & (self.DE & 0xFF))
-				self.AF = (v << 8) | (self.AF & 0x00FF)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 1
-				self.C = 0
+				self.alu(ALU_AND, self.DE & 0xFF)
 			case 0xA4: # AND A, H
-				v = ((self.AF >> 8) & (self.HL >> 8))
-				self.AF = (v << 8) | (self.AF & 0x00FF)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 1
-				self.C = 0
+				self.alu(ALU_AND, self.HL >> 8)
 			case 0xA5: # AND A, L
-				v = ((self.AF >> 8) & (self.HL & 0xFF))
-				self.AF = (v << 8) | (self.AF & 0x00FF)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 1
-				self.C = 0
+				self.alu(ALU_AND, self.HL & 0xFF)
 			case 0xA6: # AND A, HL
 				n = self.mem.read(self.HL)
-				v = ((self.AF >> 8) & n)
-				self.AF = (v << 8) | (self.AF & 0x00FF)
-				self.Z = v == 0
-				self.N = 0
-				self.H = 1
-				self.C = 0
+				self.alu(ALU_AND, n)
 			case 0xA7: # AND A, A
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 1
-				self.C = 0
+				self.alu(ALU_AND, self.AF >> 8)
 			case 0xA8: # XOR A, B
-				self.AF = (((self.AF >> 8) ^ (self.BC >> 8)) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_XOR, self.BC >> 8)
 			case 0xA9: # XOR A, B
-				self.AF = (((self.AF >> 8) ^ (self.BC & 0xFF)) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_XOR, self.BC & 0xFF)
 			case 0xAA: # XOR A, D
-				self.AF = (((self.AF >> 8) ^ (self.DE >> 8)) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_XOR, self.DE >> 8)
 			case 0xAB: # XOR A, E
-				self.AF = (((self.AF >> 8) ^ (self.DE & 0xFF)) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_XOR, self.DE & 0xFF)
 			case 0xAC: # XOR A, H
-				self.AF = (((self.AF >> 8) ^ (self.HL >> 8)) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_XOR, self.HL >> 8)
 			case 0xAD: # XOR A, L
-				self.AF = (((self.AF >> 8) ^ (self.HL & 0xFF)) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_XOR, self.HL & 0xFF)
 			case 0xAE: # XOR A, (HL)
 				n = self.mem.read(self.HL)
-				v = (self.AF >> 8) ^ n
-				self.AF = (v << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_XOR, n)
 			case 0xAF: # XOR A, A
-				self.AF = self.AF & 0x00FF
-				self.Z = 1
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_XOR, self.AF >> 8)
 
 			case 0xB0: # OR A, B
-				self.AF |= ((self.BC >> 8) << 8)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_OR, self.BC >> 8)
 			case 0xB1: # OR A, C
-				self.AF |= ((self.BC & 0xFF) << 8)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_OR, self.BC & 0xFF)
 			case 0xB2: # OR A, D
-				self.AF |= ((self.DE >> 8) << 8)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_OR, self.DE >> 8)
 			case 0xB3: # OR A, E
-				self.AF |= ((self.DE & 0xFF) << 8)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_OR, self.DE & 0xFF)
 			case 0xB4: # OR A, H
-				self.AF |= ((self.HL >> 8) << 8)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_OR, self.HL >> 8)
 			case 0xB5: # OR A, L
-				self.AF |= ((self.HL & 0xFF) << 8)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_OR, self.HL & 0xFF)
 			case 0xB6: # OR, A, (HL)
-				v = self.mem.read(self.HL)
-				self.AF |= (v << 8)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				n = self.mem.read(self.HL)
+				self.alu(ALU_OR, n)
 			case 0xB7: # OR A, A
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_OR, self.AF >> 8)
 			case 0xB8: # CP A, B
-				v = u8((self.AF >> 8) - (self.BC >> 8))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.BC >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.BC >> 8)) & 0x100) == 0x100
+				self.compare(self.BC >> 8)
 			case 0xB9: # CP A, C
-				v = u8((self.AF >> 8) - (self.BC & 0xFF))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.BC & 0xFF) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.BC & 0xFF)) & 0x100) == 0x100
+				self.compare(self.BC & 0xFF)
 			case 0xBA: # CP A, D
-				v = u8((self.AF >> 8) - (self.DE >> 8))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.DE >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.DE >> 8)) & 0x100) == 0x100
+				self.compare(self.DE >> 8)
 			case 0xBB: # CP A, E
-				v = u8((self.AF >> 8) - (self.DE & 0xFF))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.DE & 0xFF) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.DE & 0xFF)) & 0x100) == 0x100
+				self.compare(self.DE & 0xFF)
 			case 0xBC: # CP A, H
-				v = u8((self.AF >> 8) - (self.HL >> 8))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.HL >> 8) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.HL >> 8)) & 0x100) == 0x100
+				self.compare(self.HL >> 8)
 			case 0xBD: # CP A, L
-				v = u8((self.AF >> 8) - (self.HL & 0xFF))
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - ((self.HL & 0xFF) & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - (self.HL & 0xFF)) & 0x100) == 0x100
+				self.compare(self.HL & 0xFF)
 			case 0xBE:
 				n = self.mem.read(self.HL)
-				v = u8((self.AF >> 8) - n)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - (n & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - n) & 0x100) == 0x100
+				self.compare(n)
 			case 0xBF: # CP A, A
-				self.Z = 1
-				self.N = 1
-				self.H = 0
-				self.C = 0
+				self.compare(self.AF >> 8)
 
 			case 0xC0: # RET NZ
 				self.mem.tick() # internal cycle
@@ -1990,12 +872,7 @@ class opCodeTable:
 				self.mem.write(self.SP, self.BC & 0xFF)
 			case 0xC6: # ADD A, n
 				n = self.read_imm_u8()
-				v = u8((self.AF >> 8) + n)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + (n & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + n) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, n)
 			case 0xC7: # RST 00h
 				self.mem.tick() # internal cycle
 				self.SP = u16(self.SP - 1)
@@ -2043,12 +920,7 @@ class opCodeTable:
 				self.PC = nn
 			case 0xCE: # ADC n
 				n = self.read_imm_u8()
-				v = u8((self.AF >> 8) + n + self.C)
-				self.Z = v == 0
-				self.N = 0
-				self.H = ((((self.AF >> 8) & 0xF) + (n & 0xF) + self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) + n + self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_ADD, n, self.C)
 			case 0xCF: # RST 08h
 				self.mem.tick() # internal cycle
 				self.SP = u16(self.SP - 1)
@@ -2094,12 +966,7 @@ class opCodeTable:
 				self.mem.write(self.SP, self.DE & 0xFF)
 			case 0xD6: # SUB A, n
 				n = self.read_imm_u8()
-				v = u8((self.AF >> 8) - n)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - (n & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - n) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, n)
 			case 0xD7: # RST 10h
 				self.mem.tick() # internal cycle
 				self.SP = u16(self.SP - 1)
@@ -2122,7 +989,7 @@ class opCodeTable:
 				msb = self.mem.read(self.SP)
 				self.SP = u16(self.SP + 1)
 				self.PC = (msb << 8) | lsb
-				self.ime = 1
+				self.interrupts.set_ime(1)
 				self.mem.tick() # internal cycle
 			case 0xDA: #JP C, nn
 				nn = self.read_imm_u16()
@@ -2140,12 +1007,7 @@ class opCodeTable:
 					self.PC = nn
 			case 0xDE: # SBC n
 				n = self.read_imm_u8()
-				v = u8((self.AF >> 8) - n - self.C)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - (n & 0xF) - self.C) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - n - self.C) & 0x100) == 0x100
-				self.AF = (v << 8) | (self.AF & 0x00FF)
+				self.alu(ALU_SUB, n, self.C)
 			case 0xDF: # RST 18h
 				self.mem.tick() # internal cycle
 				self.SP = u16(self.SP - 1)
@@ -2173,11 +1035,7 @@ class opCodeTable:
 				self.mem.write(self.SP, self.HL & 0xFF)
 			case 0xE6: # AND n
 				n = self.read_imm_u8()
-				self.AF &= (n << 8) | 0xFF
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 1
-				self.C = 0
+				self.alu(ALU_AND, n)
 			case 0xE7: # RST 20h
 				self.mem.tick() # internal cycle
 				self.SP = u16(self.SP - 1)
@@ -2201,11 +1059,7 @@ class opCodeTable:
 				self.mem.write(nn, (self.AF >> 8))
 			case 0xEE: # XOR A, n
 				n = self.read_imm_u8()
-				self.AF = (((self.AF >> 8) ^ n) << 8) | (self.AF & 0x00FF)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_XOR, n)
 			case 0xEF: # RST 28h
 				self.mem.tick() # internal cycle
 				self.SP = u16(self.SP - 1)
@@ -2231,7 +1085,7 @@ class opCodeTable:
 				v = self.mem.read(0xFF00 | (self.BC & 0xFF))
 				self.AF = (v << 8) | (self.AF & 0x00FF)
 			case 0xF3: # DI
-				self.ime = 0
+				self.interrupts.set_ime(0)
 			case 0xF5: # PUSH AF
 				self.mem.tick() # internal cycle
 				self.SP = u16(self.SP - 1)
@@ -2240,11 +1094,7 @@ class opCodeTable:
 				self.mem.write(self.SP, self.flag_bits() | (self.AF & 0x0F))
 			case 0xF6: # OR n
 				n = self.read_imm_u8()
-				self.AF |= (n << 8)
-				self.Z = (self.AF >> 8) == 0
-				self.N = 0
-				self.H = 0
-				self.C = 0
+				self.alu(ALU_OR, n)
 			case 0xF7: # RST 30h
 				self.mem.tick() # internal cycle
 				self.SP = u16(self.SP - 1)
@@ -2267,14 +1117,10 @@ class opCodeTable:
 				nn = self.read_imm_u16()
 				self.AF = (self.AF & 0x00FF) | (self.mem.read(nn) << 8)
 			case 0xFB: # EI
-				self.delayed_ime_enable = True
+				self.interrupts.enable_delayed()
 			case 0xFE: # CP A, n
 				n = self.read_imm_u8()
-				v = u8((self.AF >> 8) - n)
-				self.Z = v == 0
-				self.N = 1
-				self.H = ((((self.AF >> 8) & 0xF) - (n & 0xF)) & 0x10) == 0x10
-				self.C = (((self.AF >> 8) - n) & 0x100) == 0x100
+				self.compare(n)
 			case 0xFF: # RST 38h
 				self.mem.tick() # internal cycle
 				self.SP = u16(self.SP - 1)
@@ -0,0 +1,1200 @@
+from opcodeCases import opCodeTable, i8, u8, u16, FLAG_Z, FLAG_N, FLAG_H, FLAG_C
+from opcodeCases import FLAGS_DONE, FLAGS_INC, FLAGS_DEC, ALU_ADD, ALU_SUB, ALU_AND, ALU_XOR, ALU_OR
+from prefixedHandlers import PREFIXED_HANDLERS
+from interrupts import INT_JOYPAD, INT_ALL
+
+# one small function per opcode so CPU.execute can dispatch with HANDLERS[opcode](table)
+# instead of walking the match statement in opCodeTable.tableLookup (which stays as the reference)
+# NOTE: keep these in sync with the arms in tableLookup, the sm83 tests run against both
+# the handlers work on the 8-bit registers directly (t.a, t.b, ...), 16-bit values like
+# (HL) addresses are put together inline rather than going through the AF/BC/DE/HL properties
+
+# the 8-bit ALU ops get A and the packed flags from one lookup in the ALU_* tables,
+# INC/DEC only record their operands (see opCodeTable.sync_flags), everything else writes the
+# packed flags straight into t.f and clears t.flag_op first. C is always up to date in t.f
+# conditional jumps/calls/returns test Z inline instead of going through the t.Z property,
+# they run far too often to pay for the extra call
+def op_00(t: opCodeTable): # NOP
+	pass
+
+def op_01(t: opCodeTable): # LD BC, nn
+	t.c = t.read_imm_u8()
+	t.b = t.read_imm_u8()
+
+def op_02(t: opCodeTable): # LD (BC), A
+	t.mem.write((t.b << 8) | t.c, t.a)
+
+def op_03(t: opCodeTable): # INC BC
+	v = u16(((t.b << 8) | t.c) + 1)
+	t.b = v >> 8
+	t.c = v & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_04(t: opCodeTable): # INC B
+	t.flag_x = t.b ^ 1
+	t.b = (t.b + 1) & 0xFF
+	t.flag_r = t.b
+	t.flag_op = FLAGS_INC
+
+def op_05(t: opCodeTable): # DEC B
+	t.flag_x = t.b ^ 1
+	t.b = (t.b - 1) & 0xFF
+	t.flag_r = t.b
+	t.flag_op = FLAGS_DEC
+
+def op_06(t: opCodeTable): # LD B, n
+	t.b = t.read_imm_u8()
+
+def op_07(t: opCodeTable): # RLCA
+	t.a = ((t.a << 1) | (t.a >> 7)) & 0xFF
+	t.flag_op = FLAGS_DONE
+	t.f = (t.a & 1) << 4
+
+def op_08(t: opCodeTable): # LD (nn), SP
+	nn = t.read_imm_u16()
+	t.mem.write(nn, t.SP & 0xFF)
+	t.mem.write(nn + 1, t.SP >> 8)
+
+def op_09(t: opCodeTable): # ADD HL, BC
+	hl = (t.h << 8) | t.l
+	rr = (t.b << 8) | t.c
+	v = hl + rr
+	t.f = (t.flag_bits() & FLAG_Z) | (((hl ^ rr ^ v) >> 7) & FLAG_H) | ((v >> 12) & FLAG_C)
+	hl = v & 0xFFFF
+	t.h = hl >> 8
+	t.l = hl & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_0A(t: opCodeTable): # LD A, (BC)
+	t.a = t.mem.read((t.b << 8) | t.c)
+
+def op_0B(t: opCodeTable): # DEC BC
+	v = u16(((t.b << 8) | t.c) - 1)
+	t.b = v >> 8
+	t.c = v & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_0C(t: opCodeTable): # INC C
+	t.flag_x = t.c ^ 1
+	t.c = (t.c + 1) & 0xFF
+	t.flag_r = t.c
+	t.flag_op = FLAGS_INC
+
+def op_0D(t: opCodeTable): # DEC C
+	t.flag_x = t.c ^ 1
+	t.c = (t.c - 1) & 0xFF
+	t.flag_r = t.c
+	t.flag_op = FLAGS_DEC
+
+def op_0E(t: opCodeTable): # LD C, n
+	t.c = t.read_imm_u8()
+
+def op_0F(t: opCodeTable): # RRCA
+	c = t.a & 1
+	t.a = (t.a >> 1) | (c << 7)
+	t.flag_op = FLAGS_DONE
+	t.f = c << 4
+
+def op_10(t: opCodeTable): # STOP
+	# treated as a HALT that only a joypad interrupt wakes up
+	t.read_imm_u8()
+	t.wake_mask = INT_JOYPAD
+	if t.interrupts.requested & t.wake_mask:
+		t.halted = False
+	else:
+		t.halted = True
+		t.PC = u16(t.PC - 2)
+
+def op_11(t: opCodeTable): # LD DE, nn
+	t.e = t.read_imm_u8()
+	t.d = t.read_imm_u8()
+
+def op_12(t: opCodeTable): # LD (DE), A
+	t.mem.write((t.d << 8) | t.e, t.a)
+
+def op_13(t: opCodeTable): # INC DE
+	v = u16(((t.d << 8) | t.e) + 1)
+	t.d = v >> 8
+	t.e = v & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_14(t: opCodeTable): # INC D
+	t.flag_x = t.d ^ 1
+	t.d = (t.d + 1) & 0xFF
+	t.flag_r = t.d
+	t.flag_op = FLAGS_INC
+
+def op_15(t: opCodeTable): # DEC D
+	t.flag_x = t.d ^ 1
+	t.d = (t.d - 1) & 0xFF
+	t.flag_r = t.d
+	t.flag_op = FLAGS_DEC
+
+def op_16(t: opCodeTable): # LD D, n
+	t.d = t.read_imm_u8()
+
+def op_17(t: opCodeTable): # RLA
+	v = (t.a << 1) | t.C
+	t.a = v & 0xFF
+	t.flag_op = FLAGS_DONE
+	t.f = (v >> 4) & FLAG_C
+
+def op_18(t: opCodeTable): # JR e
+	e = i8(t.read_imm_u8())
+	t.PC = u16(t.PC + e)
+	t.mem.tick()
+
+def op_19(t: opCodeTable): # ADD HL, DE
+	hl = (t.h << 8) | t.l
+	rr = (t.d << 8) | t.e
+	v = hl + rr
+	t.f = (t.flag_bits() & FLAG_Z) | (((hl ^ rr ^ v) >> 7) & FLAG_H) | ((v >> 12) & FLAG_C)
+	hl = v & 0xFFFF
+	t.h = hl >> 8
+	t.l = hl & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_1A(t: opCodeTable): # LD A, (DE)
+	t.a = t.mem.read((t.d << 8) | t.e)
+
+def op_1B(t: opCodeTable): # DEC DE
+	v = u16(((t.d << 8) | t.e) - 1)
+	t.d = v >> 8
+	t.e = v & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_1C(t: opCodeTable): # INC E
+	t.flag_x = t.e ^ 1
+	t.e = (t.e + 1) & 0xFF
+	t.flag_r = t.e
+	t.flag_op = FLAGS_INC
+
+def op_1D(t: opCodeTable): # DEC E
+	t.flag_x = t.e ^ 1
+	t.e = (t.e - 1) & 0xFF
+	t.flag_r = t.e
+	t.flag_op = FLAGS_DEC
+
+def op_1E(t: opCodeTable): # LD E, n
+	t.e = t.read_imm_u8()
+
+def op_1F(t: opCodeTable): # RRA
+	c = t.a & 1
+	t.a = (t.a >> 1) | (t.C << 7)
+	t.flag_op = FLAGS_DONE
+	t.f = c << 4
+
+def op_20(t: opCodeTable): # JR NZ, e
+	e = i8(t.read_imm_u8())
+	if (t.flag_r & 0xFF) if t.flag_op else (not t.f & FLAG_Z):
+		t.PC = u16(t.PC + e)
+		t.mem.tick() # internal cycle
+
+def op_21(t: opCodeTable): # LD HL, nn
+	t.l = t.read_imm_u8()
+	t.h = t.read_imm_u8()
+
+def op_22(t: opCodeTable): # LD (HL+), A
+	hl = (t.h << 8) | t.l
+	t.mem.write(hl, t.a)
+	hl = u16(hl + 1)
+	t.h = hl >> 8
+	t.l = hl & 0xFF
+
+def op_23(t: opCodeTable): # INC HL
+	v = u16(((t.h << 8) | t.l) + 1)
+	t.h = v >> 8
+	t.l = v & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_24(t: opCodeTable): # INC H
+	t.flag_x = t.h ^ 1
+	t.h = (t.h + 1) & 0xFF
+	t.flag_r = t.h
+	t.flag_op = FLAGS_INC
+
+def op_25(t: opCodeTable): # DEC H
+	t.flag_x = t.h ^ 1
+	t.h = (t.h - 1) & 0xFF
+	t.flag_r = t.h
+	t.flag_op = FLAGS_DEC
+
+def op_26(t: opCodeTable): # LD H, n
+	t.h = t.read_imm_u8()
+
+def op_27(t: opCodeTable): # DAA
+	# https://blog.ollien.com/posts/gb-daa/
+	# https://github.com/Baekalfen/PyBoy/blob/934054c385d8027a98185fbb8f23f34f20903adb/pyboy/core/opcodes.py#L422 (thank you!)
+	f = t.flag_bits()
+	v = t.a
+	corr = 0
+	corr |= 0x06 if (f & FLAG_H) else 0x00
+	corr |= 0x60 if (f & FLAG_C) else 0x00
+
+	if (f & FLAG_N) != 0:
+		v -= corr
+	else:
+		corr |= 0x06 if (v & 0x0F) > 0x09 else 0x00
+		corr |= 0x60 if v > 0x99 else 0x00
+		v += corr
+
+	t.a = u8(v)
+	t.f = (f & FLAG_N) | (0 if t.a else FLAG_Z) | (FLAG_C if corr & 0x60 else 0)
+
+def op_28(t: opCodeTable): # JR Z, e
+	e = i8(t.read_imm_u8())
+	if ((t.flag_r & 0xFF) == 0) if t.flag_op else (t.f & FLAG_Z):
+		t.PC = u16(t.PC + e)
+		t.mem.tick() # internal cycle
+
+def op_29(t: opCodeTable): # ADD HL, HL
+	hl = (t.h << 8) | t.l
+	rr = (t.h << 8) | t.l
+	v = hl + rr
+	t.f = (t.flag_bits() & FLAG_Z) | (((hl ^ rr ^ v) >> 7) & FLAG_H) | ((v >> 12) & FLAG_C)
+	hl = v & 0xFFFF
+	t.h = hl >> 8
+	t.l = hl & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_2A(t: opCodeTable): # LD A, (HL+)
+	hl = (t.h << 8) | t.l
+	t.a = t.mem.read(hl)
+	hl = u16(hl + 1)
+	t.h = hl >> 8
+	t.l = hl & 0xFF
+
+def op_2B(t: opCodeTable): # DEC HL
+	v = u16(((t.h << 8) | t.l) - 1)
+	t.h = v >> 8
+	t.l = v & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_2C(t: opCodeTable): # INC L
+	t.flag_x = t.l ^ 1
+	t.l = (t.l + 1) & 0xFF
+	t.flag_r = t.l
+	t.flag_op = FLAGS_INC
+
+def op_2D(t: opCodeTable): # DEC L
+	t.flag_x = t.l ^ 1
+	t.l = (t.l - 1) & 0xFF
+	t.flag_r = t.l
+	t.flag_op = FLAGS_DEC
+
+def op_2E(t: opCodeTable): # LD L, n
+	t.l = t.read_imm_u8()
+
+def op_2F(t: opCodeTable): # CPL
+	t.a ^= 0xFF
+	t.f = t.flag_bits() | FLAG_N | FLAG_H
+
+def op_30(t: opCodeTable): # JR NC, e
+	e = i8(t.read_imm_u8())
+	if not t.f & FLAG_C:
+		t.PC = u16(t.PC + e)
+		t.mem.tick() # internal cycle
+
+def op_31(t: opCodeTable): # LD SP, nn
+	t.SP = t.read_imm_u16()
+
+def op_32(t: opCodeTable): # LD (HL-), A
+	hl = (t.h << 8) | t.l
+	t.mem.write(hl, t.a)
+	hl = u16(hl - 1)
+	t.h = hl >> 8
+	t.l = hl & 0xFF
+
+def op_33(t: opCodeTable): # INC SP
+	t.SP = u16(t.SP + 1)
+	t.mem.tick() # internal cycle
+
+def op_34(t: opCodeTable): # INC (HL)
+	hl = (t.h << 8) | t.l
+	n = t.mem.read(hl)
+	v = (n + 1) & 0xFF
+	t.flag_x = n ^ 1
+	t.flag_r = v
+	t.flag_op = FLAGS_INC
+	t.mem.write(hl, v)
+
+def op_35(t: opCodeTable): # DEC (HL)
+	hl = (t.h << 8) | t.l
+	n = t.mem.read(hl)
+	v = (n - 1) & 0xFF
+	t.flag_x = n ^ 1
+	t.flag_r = v
+	t.flag_op = FLAGS_DEC
+	t.mem.write(hl, v)
+
+def op_36(t: opCodeTable): # LD (HL), n
+	n = t.read_imm_u8()
+	t.mem.write((t.h << 8) | t.l, n)
+
+def op_37(t: opCodeTable): # SCF
+	t.f = (t.flag_bits() & FLAG_Z) | FLAG_C
+
+def op_38(t: opCodeTable): # JR C, e
+	e = i8(t.read_imm_u8())
+	if t.f & FLAG_C:
+		t.PC = u16(t.PC + e)
+		t.mem.tick() # internal cycle
+
+def op_39(t: opCodeTable): # ADD HL, SP
+	hl = (t.h << 8) | t.l
+	v = hl + t.SP
+	t.f = (t.flag_bits() & FLAG_Z) | (((hl ^ t.SP ^ v) >> 7) & FLAG_H) | ((v >> 12) & FLAG_C)
+	hl = v & 0xFFFF
+	t.h = hl >> 8
+	t.l = hl & 0xFF
+	t.mem.tick() # internal cycle
+
+def op_3A(t: opCodeTable): # LD A, (HL-)
+	hl = (t.h << 8) | t.l
+	t.a = t.mem.read(hl)
+	hl = u16(hl - 1)
+	t.h = hl >> 8
+	t.l = hl & 0xFF
+
+def op_3B(t: opCodeTable): # DEC SP
+	t.SP = u16(t.SP - 1)
+	t.mem.tick() # internal cycle
+
+def op_3C(t: opCodeTable): # INC A
+	t.flag_x = t.a ^ 1
+	t.a = (t.a + 1) & 0xFF
+	t.flag_r = t.a
+	t.flag_op = FLAGS_INC
+
+def op_3D(t: opCodeTable): # DEC A
+	t.flag_x = t.a ^ 1
+	t.a = (t.a - 1) & 0xFF
+	t.flag_r = t.a
+	t.flag_op = FLAGS_DEC
+
+def op_3E(t: opCodeTable): # LD A, n
+	t.a = t.read_imm_u8()
+
+def op_3F(t: opCodeTable): # CCF
+	t.f = (t.flag_bits() & (FLAG_Z | FLAG_C)) ^ FLAG_C
+
+def op_40(t: opCodeTable): # LD B, B
+	pass
+
+def op_41(t: opCodeTable): # LD B, C
+	t.b = t.c
+
+def op_42(t: opCodeTable): # LD B, D
+	t.b = t.d
+
+def op_43(t: opCodeTable): # LD B, E
+	t.b = t.e
+
+def op_44(t: opCodeTable): # LD B, H
+	t.b = t.h
+
+def op_45(t: opCodeTable): # LD B, L
+	t.b = t.l
+
+def op_46(t: opCodeTable): # LD B, (HL)
+	t.b = t.mem.read((t.h << 8) | t.l)
+
+def op_47(t: opCodeTable): # LD B, A
+	t.b = t.a
+
+def op_48(t: opCodeTable): # LD C, B
+	t.c = t.b
+
+def op_49(t: opCodeTable): # LD C, C
+	pass
+
+def op_4A(t: opCodeTable): # LD C, D
+	t.c = t.d
+
+def op_4B(t: opCodeTable): # LD C, E
+	t.c = t.e
+
+def op_4C(t: opCodeTable): # LD C, H
+	t.c = t.h
+
+def op_4D(t: opCodeTable): # LD C, L
+	t.c = t.l
+
+def op_4E(t: opCodeTable): # LD C, (HL)
+	t.c = t.mem.read((t.h << 8) | t.l)
+
+def op_4F(t: opCodeTable): # LD C, A
+	t.c = t.a
+
+def op_50(t: opCodeTable): # LD D, B
+	t.d = t.b
+
+def op_51(t: opCodeTable): # LD D, C
+	t.d = t.c
+
+def op_52(t: opCodeTable): # LD D, D
+	pass
+
+def op_53(t: opCodeTable): # LD D, E
+	t.d = t.e
+
+def op_54(t: opCodeTable): # LD D, H
+	t.d = t.h
+
+def op_55(t: opCodeTable): # LD D, L
+	t.d = t.l
+
+def op_56(t: opCodeTable): # LD D, (HL)
+	t.d = t.mem.read((t.h << 8) | t.l)
+
+def op_57(t: opCodeTable): # LD D, A
+	t.d = t.a
+
+def op_58(t: opCodeTable): # LD E, B
+	t.e = t.b
+
+def op_59(t: opCodeTable): # LD E, C
+	t.e = t.c
+
+def op_5A(t: opCodeTable): # LD E, D
+	t.e = t.d
+
+def op_5B(t: opCodeTable): # LD E, E
+	pass
+
+def op_5C(t: opCodeTable): # LD E, H
+	t.e = t.h
+
+def op_5D(t: opCodeTable): # LD E, L
+	t.e = t.l
+
+def op_5E(t: opCodeTable): # LD E, (HL)
+	t.e = t.mem.read((t.h << 8) | t.l)
+
+def op_5F(t: opCodeTable): # LD E, A
+	t.e = t.a
+
+def op_60(t: opCodeTable): # LD H, B
+	t.h = t.b
+
+def op_61(t: opCodeTable): # LD H, C
+	t.h = t.c
+
+def op_62(t: opCodeTable): # LD H, D
+	t.h = t.d
+
+def op_63(t: opCodeTable): # LD H, E
+	t.h = t.e
+
+def op_64(t: opCodeTable): # LD H, H
+	pass
+
+def op_65(t: opCodeTable): # LD H, L
+	t.h = t.l
+
+def op_66(t: opCodeTable): # LD H, (HL)
+	t.h = t.mem.read((t.h << 8) | t.l)
+
+def op_67(t: opCodeTable): # LD H, A
+	t.h = t.a
+
+def op_68(t: opCodeTable): # LD L, B
+	t.l = t.b
+
+def op_69(t: opCodeTable): # LD L, C
+	t.l = t.c
+
+def op_6A(t: opCodeTable): # LD L, D
+	t.l = t.d
+
+def op_6B(t: opCodeTable): # LD L, E
+	t.l = t.e
+
+def op_6C(t: opCodeTable): # LD L, H
+	t.l = t.h
+
+def op_6D(t: opCodeTable): # LD L, L
+	pass
+
+def op_6E(t: opCodeTable): # LD L, (HL)
+	t.l = t.mem.read((t.h << 8) | t.l)
+
+def op_6F(t: opCodeTable): # LD L, A
+	t.l = t.a
+
+def op_70(t: opCodeTable): # LD (HL), B
+	t.mem.write((t.h << 8) | t.l, t.b)
+
+def op_71(t: opCodeTable): # LD (HL), C
+	t.mem.write((t.h << 8) | t.l, t.c)
+
+def op_72(t: opCodeTable): # LD (HL), D
+	t.mem.write((t.h << 8) | t.l, t.d)
+
+def op_73(t: opCodeTable): # LD (HL), E
+	t.mem.write((t.h << 8) | t.l, t.e)
+
+def op_74(t: opCodeTable): # LD (HL), H
+	t.mem.write((t.h << 8) | t.l, t.h)
+
+def op_75(t: opCodeTable): # LD (HL), L
+	t.mem.write((t.h << 8) | t.l, t.l)
+
+def op_76(t: opCodeTable): # HALT
+	t.wake_mask = INT_ALL
+	if t.interrupts.requested:
+		# an interrupt is pending, carry on (the HALT bug isn't emulated)
+		t.halted = False
+	else:
+		# go back onto the HALT, see opCodeTable.halted
+		t.halted = True
+		t.PC = u16(t.PC - 1)
+
+def op_77(t: opCodeTable): # LD (HL), A
+	t.mem.write((t.h << 8) | t.l, t.a)
+
+def op_78(t: opCodeTable): # LD A, B
+	t.a = t.b
+
+def op_79(t: opCodeTable): # LD A, C
+	t.a = t.c
+
+def op_7A(t: opCodeTable): # LD A, D
+	t.a = t.d
+
+def op_7B(t: opCodeTable): # LD A, E
+	t.a = t.e
+
+def op_7C(t: opCodeTable): # LD A, H
+	t.a = t.h
+
+def op_7D(t: opCodeTable): # LD A, L
+	t.a = t.l
+
+def op_7E(t: opCodeTable): # LD A, (HL)
+	t.a = t.mem.read((t.h << 8) | t.l)
+
+def op_7F(t: opCodeTable): # LD A, A
+	pass
+
+def op_80(t: opCodeTable): # ADD A, B
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[(t.a << 8) | t.b]
+
+def op_81(t: opCodeTable): # ADD A, C
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[(t.a << 8) | t.c]
+
+def op_82(t: opCodeTable): # ADD A, D
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[(t.a << 8) | t.d]
+
+def op_83(t: opCodeTable): # ADD A, E
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[(t.a << 8) | t.e]
+
+def op_84(t: opCodeTable): # ADD A, H
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[(t.a << 8) | t.h]
+
+def op_85(t: opCodeTable): # ADD A, L
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[(t.a << 8) | t.l]
+
+def op_86(t: opCodeTable): # ADD A, (HL)
+	n = t.mem.read((t.h << 8) | t.l)
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[(t.a << 8) | n]
+
+def op_87(t: opCodeTable): # ADD A, A
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[(t.a << 8) | t.a]
+
+def op_88(t: opCodeTable): # ADC A, B
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[((t.f & FLAG_C) << 12) | (t.a << 8) | t.b]
+
+def op_89(t: opCodeTable): # ADC A, C
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[((t.f & FLAG_C) << 12) | (t.a << 8) | t.c]
+
+def op_8A(t: opCodeTable): # ADC A, D
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[((t.f & FLAG_C) << 12) | (t.a << 8) | t.d]
+
+def op_8B(t: opCodeTable): # ADC A, E
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[((t.f & FLAG_C) << 12) | (t.a << 8) | t.e]
+
+def op_8C(t: opCodeTable): # ADC A, H
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[((t.f & FLAG_C) << 12) | (t.a << 8) | t.h]
+
+def op_8D(t: opCodeTable): # ADC A, L
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[((t.f & FLAG_C) << 12) | (t.a << 8) | t.l]
+
+def op_8E(t: opCodeTable): # ADC A, (HL)
+	n = t.mem.read((t.h << 8) | t.l)
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[((t.f & FLAG_C) << 12) | (t.a << 8) | n]
+
+def op_8F(t: opCodeTable): # ADC A, A
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[((t.f & FLAG_C) << 12) | (t.a << 8) | t.a]
+
+def op_90(t: opCodeTable): # SUB A, B
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[(t.a << 8) | t.b]
+
+def op_91(t: opCodeTable): # SUB A, C
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[(t.a << 8) | t.c]
+
+def op_92(t: opCodeTable): # SUB A, D
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[(t.a << 8) | t.d]
+
+def op_93(t: opCodeTable): # SUB A, E
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[(t.a << 8) | t.e]
+
+def op_94(t: opCodeTable): # SUB A, H
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[(t.a << 8) | t.h]
+
+def op_95(t: opCodeTable): # SUB A, L
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[(t.a << 8) | t.l]
+
+def op_96(t: opCodeTable): # SUB A, (HL)
+	n = t.mem.read((t.h << 8) | t.l)
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[(t.a << 8) | n]
+
+def op_97(t: opCodeTable): # SUB A, A
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[(t.a << 8) | t.a]
+
+def op_98(t: opCodeTable): # SBC A, B
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[((t.f & FLAG_C) << 12) | (t.a << 8) | t.b]
+
+def op_99(t: opCodeTable): # SBC A, C
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[((t.f & FLAG_C) << 12) | (t.a << 8) | t.c]
+
+def op_9A(t: opCodeTable): # SBC A, D
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[((t.f & FLAG_C) << 12) | (t.a << 8) | t.d]
+
+def op_9B(t: opCodeTable): # SBC A, E
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[((t.f & FLAG_C) << 12) | (t.a << 8) | t.e]
+
+def op_9C(t: opCodeTable): # SBC A, H
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[((t.f & FLAG_C) << 12) | (t.a << 8) | t.h]
+
+def op_9D(t: opCodeTable): # SBC A, L
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[((t.f & FLAG_C) << 12) | (t.a << 8) | t.l]
+
+def op_9E(t: opCodeTable): # SBC A, (HL)
+	n = t.mem.read((t.h << 8) | t.l)
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[((t.f & FLAG_C) << 12) | (t.a << 8) | n]
+
+def op_9F(t: opCodeTable): # SBC A, A
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[((t.f & FLAG_C) << 12) | (t.a << 8) | t.a]
+
+def op_A0(t: opCodeTable): # AND A, B
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_AND[(t.a << 8) | t.b]
+
+def op_A1(t: opCodeTable): # AND A, C
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_AND[(t.a << 8) | t.c]
+
+def op_A2(t: opCodeTable): # AND A, D
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_AND[(t.a << 8) | t.d]
+
+def op_A3(t: opCodeTable): # AND A, E
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_AND[(t.a << 8) | t.e]
+
+def op_A4(t: opCodeTable): # AND A, H
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_AND[(t.a << 8) | t.h]
+
+def op_A5(t: opCodeTable): # AND A, L
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_AND[(t.a << 8) | t.l]
+
+def op_A6(t: opCodeTable): # AND A, (HL)
+	n = t.mem.read((t.h << 8) | t.l)
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_AND[(t.a << 8) | n]
+
+def op_A7(t: opCodeTable): # AND A, A
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_AND[(t.a << 8) | t.a]
+
+def op_A8(t: opCodeTable): # XOR A, B
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_XOR[(t.a << 8) | t.b]
+
+def op_A9(t: opCodeTable): # XOR A, C
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_XOR[(t.a << 8) | t.c]
+
+def op_AA(t: opCodeTable): # XOR A, D
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_XOR[(t.a << 8) | t.d]
+
+def op_AB(t: opCodeTable): # XOR A, E
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_XOR[(t.a << 8) | t.e]
+
+def op_AC(t: opCodeTable): # XOR A, H
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_XOR[(t.a << 8) | t.h]
+
+def op_AD(t: opCodeTable): # XOR A, L
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_XOR[(t.a << 8) | t.l]
+
+def op_AE(t: opCodeTable): # XOR A, (HL)
+	n = t.mem.read((t.h << 8) | t.l)
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_XOR[(t.a << 8) | n]
+
+def op_AF(t: opCodeTable): # XOR A, A
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_XOR[(t.a << 8) | t.a]
+
+def op_B0(t: opCodeTable): # OR A, B
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_OR[(t.a << 8) | t.b]
+
+def op_B1(t: opCodeTable): # OR A, C
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_OR[(t.a << 8) | t.c]
+
+def op_B2(t: opCodeTable): # OR A, D
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_OR[(t.a << 8) | t.d]
+
+def op_B3(t: opCodeTable): # OR A, E
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_OR[(t.a << 8) | t.e]
+
+def op_B4(t: opCodeTable): # OR A, H
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_OR[(t.a << 8) | t.h]
+
+def op_B5(t: opCodeTable): # OR A, L
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_OR[(t.a << 8) | t.l]
+
+def op_B6(t: opCodeTable): # OR A, (HL)
+	n = t.mem.read((t.h << 8) | t.l)
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_OR[(t.a << 8) | n]
+
+def op_B7(t: opCodeTable): # OR A, A
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_OR[(t.a << 8) | t.a]
+
+def op_B8(t: opCodeTable): # CP A, B
+	t.flag_op = FLAGS_DONE
+	t.f = ALU_SUB[(t.a << 8) | t.b][1]
+
+def op_B9(t: opCodeTable): # CP A, C
+	t.flag_op = FLAGS_DONE
+	t.f = ALU_SUB[(t.a << 8) | t.c][1]
+
+def op_BA(t: opCodeTable): # CP A, D
+	t.flag_op = FLAGS_DONE
+	t.f = ALU_SUB[(t.a << 8) | t.d][1]
+
+def op_BB(t: opCodeTable): # CP A, E
+	t.flag_op = FLAGS_DONE
+	t.f = ALU_SUB[(t.a << 8) | t.e][1]
+
+def op_BC(t: opCodeTable): # CP A, H
+	t.flag_op = FLAGS_DONE
+	t.f = ALU_SUB[(t.a << 8) | t.h][1]
+
+def op_BD(t: opCodeTable): # CP A, L
+	t.flag_op = FLAGS_DONE
+	t.f = ALU_SUB[(t.a << 8) | t.l][1]
+
+def op_BE(t: opCodeTable): # CP A, (HL)
+	n = t.mem.read((t.h << 8) | t.l)
+	t.flag_op = FLAGS_DONE
+	t.f = ALU_SUB[(t.a << 8) | n][1]
+
+def op_BF(t: opCodeTable): # CP A, A
+	t.flag_op = FLAGS_DONE
+	t.f = ALU_SUB[(t.a << 8) | t.a][1]
+
+def op_C0(t: opCodeTable): # RET NZ
+	t.mem.tick() # internal cycle
+	if (t.flag_r & 0xFF) if t.flag_op else (not t.f & FLAG_Z):
+		lsb = t.mem.read(t.SP)
+		t.SP = u16(t.SP + 1)
+		msb = t.mem.read(t.SP)
+		t.SP = u16(t.SP + 1)
+		t.PC = (msb << 8) | lsb
+		t.mem.tick() # internal cycle
+
+def op_C1(t: opCodeTable): # POP BC
+	t.c = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+	t.b = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+
+def op_C2(t: opCodeTable): # JP NZ, nn
+	nn = t.read_imm_u16()
+	if (t.flag_r & 0xFF) if t.flag_op else (not t.f & FLAG_Z):
+		t.PC = nn
+		t.mem.tick() # internal cycle
+
+def op_C3(t: opCodeTable): # JP nn
+	t.PC = t.read_imm_u16()
+	t.mem.tick() # internal cycle
+
+def op_C4(t: opCodeTable): # CALL NZ, nn
+	nn = t.read_imm_u16()
+	if (t.flag_r & 0xFF) if t.flag_op else (not t.f & FLAG_Z):
+		t.mem.tick() # internal cycle
+		t.SP = u16(t.SP - 1)
+		t.mem.write(t.SP, t.PC >> 8)
+		t.SP = u16(t.SP - 1)
+		t.mem.write(t.SP, t.PC & 0xFF)
+		t.PC = nn
+
+def op_C5(t: opCodeTable): # PUSH BC
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.b)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.c)
+
+def op_C6(t: opCodeTable): # ADD A, n
+	n = t.read_imm_u8()
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[(t.a << 8) | n]
+
+def op_C7(t: opCodeTable): # RST 00h
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC >> 8)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC & 0xFF)
+	t.PC = 0
+
+def op_C8(t: opCodeTable): # RET Z
+	t.mem.tick() # internal cycle
+	if ((t.flag_r & 0xFF) == 0) if t.flag_op else (t.f & FLAG_Z):
+		lsb = t.mem.read(t.SP)
+		t.SP = u16(t.SP + 1)
+		msb = t.mem.read(t.SP)
+		t.SP = u16(t.SP + 1)
+		t.PC = (msb << 8) | lsb
+		t.mem.tick() # internal cycle
+
+def op_C9(t: opCodeTable): # RET
+	lsb = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+	msb = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+	t.PC = (msb << 8) | lsb
+	t.mem.tick() # internal cycle
+
+def op_CA(t: opCodeTable): # JP Z, nn
+	nn = t.read_imm_u16()
+	if ((t.flag_r & 0xFF) == 0) if t.flag_op else (t.f & FLAG_Z):
+		t.PC = nn
+		t.mem.tick() # internal cycle
+
+def op_CB(t: opCodeTable): # PREFIX CB
+	code = t.read_imm_u8()
+	PREFIXED_HANDLERS[code](t)
+
+def op_CC(t: opCodeTable): # CALL Z, nn
+	nn = t.read_imm_u16()
+	if ((t.flag_r & 0xFF) == 0) if t.flag_op else (t.f & FLAG_Z):
+		t.mem.tick() # internal cycle
+		t.SP = u16(t.SP - 1)
+		t.mem.write(t.SP, t.PC >> 8)
+		t.SP = u16(t.SP - 1)
+		t.mem.write(t.SP, t.PC & 0xFF)
+		t.PC = nn
+
+def op_CD(t: opCodeTable): # CALL nn
+	nn = t.read_imm_u16()
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC >> 8)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC & 0xFF)
+	t.PC = nn
+
+def op_CE(t: opCodeTable): # ADC A, n
+	n = t.read_imm_u8()
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_ADD[((t.f & FLAG_C) << 12) | (t.a << 8) | n]
+
+def op_CF(t: opCodeTable): # RST 08h
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC >> 8)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC & 0xFF)
+	t.PC = 0x08
+
+def op_D0(t: opCodeTable): # RET NC
+	t.mem.tick() # internal cycle
+	if not t.f & FLAG_C:
+		lsb = t.mem.read(t.SP)
+		t.SP = u16(t.SP + 1)
+		msb = t.mem.read(t.SP)
+		t.SP = u16(t.SP + 1)
+		t.PC = (msb << 8) | lsb
+		t.mem.tick() # internal cycle
+
+def op_D1(t: opCodeTable): # POP DE
+	t.e = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+	t.d = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+
+def op_D2(t: opCodeTable): # JP NC, nn
+	nn = t.read_imm_u16()
+	if not t.f & FLAG_C:
+		t.PC = nn
+		t.mem.tick() # internal cycle
+
+def op_D4(t: opCodeTable): # CALL NC, nn
+	nn = t.read_imm_u16()
+	if not t.f & FLAG_C:
+		t.mem.tick() # internal cycle
+		t.SP = u16(t.SP - 1)
+		t.mem.write(t.SP, t.PC >> 8)
+		t.SP = u16(t.SP - 1)
+		t.mem.write(t.SP, t.PC & 0xFF)
+		t.PC = nn
+
+def op_D5(t: opCodeTable): # PUSH DE
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.d)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.e)
+
+def op_D6(t: opCodeTable): # SUB A, n
+	n = t.read_imm_u8()
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[(t.a << 8) | n]
+
+def op_D7(t: opCodeTable): # RST 10h
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC >> 8)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC & 0xFF)
+	t.PC = 0x10
+
+def op_D8(t: opCodeTable): # RET C
+	t.mem.tick() # internal cycle
+	if t.f & FLAG_C:
+		lsb = t.mem.read(t.SP)
+		t.SP = u16(t.SP + 1)
+		msb = t.mem.read(t.SP)
+		t.SP = u16(t.SP + 1)
+		t.PC = (msb << 8) | lsb
+		t.mem.tick() # internal cycle
+
+def op_D9(t: opCodeTable): # RETI
+	lsb = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+	msb = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+	t.PC = (msb << 8) | lsb
+	t.interrupts.set_ime(1)
+	t.mem.tick() # internal cycle
+
+def op_DA(t: opCodeTable): # JP C, nn
+	nn = t.read_imm_u16()
+	if t.f & FLAG_C:
+		t.PC = nn
+		t.mem.tick() # internal cycle
+
+def op_DC(t: opCodeTable): # CALL C, nn
+	nn = t.read_imm_u16()
+	if t.f & FLAG_C:
+		t.mem.tick() # internal cycle
+		t.SP = u16(t.SP - 1)
+		t.mem.write(t.SP, t.PC >> 8)
+		t.SP = u16(t.SP - 1)
+		t.mem.write(t.SP, t.PC & 0xFF)
+		t.PC = nn
+
+def op_DE(t: opCodeTable): # SBC A, n
+	n = t.read_imm_u8()
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_SUB[((t.f & FLAG_C) << 12) | (t.a << 8) | n]
+
+def op_DF(t: opCodeTable): # RST 18h
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC >> 8)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC & 0xFF)
+	t.PC = 0x18
+
+def op_E0(t: opCodeTable): # LDH (n), A
+	n = t.read_imm_u8()
+	t.mem.write(0xFF00 | n, t.a)
+
+def op_E1(t: opCodeTable): # POP HL
+	t.l = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+	t.h = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+
+def op_E2(t: opCodeTable): # LD (FF00+C), A
+	t.mem.write(0xFF00 | t.c, t.a)
+
+def op_E5(t: opCodeTable): # PUSH HL
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.h)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.l)
+
+def op_E6(t: opCodeTable): # AND A, n
+	n = t.read_imm_u8()
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_AND[(t.a << 8) | n]
+
+def op_E7(t: opCodeTable): # RST 20h
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC >> 8)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC & 0xFF)
+	t.PC = 0x20
+
+def op_E8(t: opCodeTable): # ADD SP, e
+	e = i8(t.read_imm_u8())
+	x = (t.SP & 0xFF) ^ (e & 0xFF) ^ ((t.SP & 0xFF) + (e & 0xFF))
+	t.flag_op = FLAGS_DONE
+	t.f = ((x << 1) & FLAG_H) | ((x >> 4) & FLAG_C)
+	t.SP = u16(t.SP + e)
+	t.mem.tick() # internal cycle
+	t.mem.tick() # SP write internal cycle (?)
+
+def op_E9(t: opCodeTable): # JP HL
+	t.PC = (t.h << 8) | t.l
+
+def op_EA(t: opCodeTable): # LD (nn), A
+	nn = t.read_imm_u16()
+	t.mem.write(nn, t.a)
+
+def op_EE(t: opCodeTable): # XOR A, n
+	n = t.read_imm_u8()
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_XOR[(t.a << 8) | n]
+
+def op_EF(t: opCodeTable): # RST 28h
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC >> 8)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC & 0xFF)
+	t.PC = 0x28
+
+def op_F0(t: opCodeTable): # LDH A, (n)
+	n = t.read_imm_u8()
+	t.a = t.mem.read(0xFF00 | n)
+
+def op_F1(t: opCodeTable): # POP AF
+	lsb = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+	t.a = t.mem.read(t.SP)
+	t.SP = u16(t.SP + 1)
+	t.flag_op = FLAGS_DONE
+	t.f = lsb & 0xF0
+
+def op_F2(t: opCodeTable): # LD A, (FF00+C)
+	t.a = t.mem.read(0xFF00 | t.c)
+
+def op_F3(t: opCodeTable): # DI
+	t.interrupts.set_ime(0)
+
+def op_F5(t: opCodeTable): # PUSH AF
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.a)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.flag_bits())
+
+def op_F6(t: opCodeTable): # OR A, n
+	n = t.read_imm_u8()
+	t.flag_op = FLAGS_DONE
+	t.a, t.f = ALU_OR[(t.a << 8) | n]
+
+def op_F7(t: opCodeTable): # RST 30h
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC >> 8)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC & 0xFF)
+	t.PC = 0x30
+
+def op_F8(t: opCodeTable): # LD HL, SP+e
+	e = i8(t.read_imm_u8())
+	hl = u16(t.SP + e)
+	t.h = hl >> 8
+	t.l = hl & 0xFF
+	x = (t.SP & 0xFF) ^ (e & 0xFF) ^ ((t.SP & 0xFF) + (e & 0xFF))
+	t.flag_op = FLAGS_DONE
+	t.f = ((x << 1) & FLAG_H) | ((x >> 4) & FLAG_C)
+	t.mem.tick() # internal cycle
+
+def op_F9(t: opCodeTable): # LD SP, HL
+	t.SP = (t.h << 8) | t.l
+	t.mem.tick() # internal cycle
+
+def op_FA(t: opCodeTable): # LD A, (nn)
+	nn = t.read_imm_u16()
+	t.a = t.mem.read(nn)
+
+def op_FB(t: opCodeTable): # EI
+	t.interrupts.enable_delayed()
+
+def op_FE(t: opCodeTable): # CP A, n
+	n = t.read_imm_u8()
+	t.flag_op = FLAGS_DONE
+	t.f = ALU_SUB[(t.a << 8) | n][1]
+
+def op_FF(t: opCodeTable): # RST 38h
+	t.mem.tick() # internal cycle
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC >> 8)
+	t.SP = u16(t.SP - 1)
+	t.mem.write(t.SP, t.PC & 0xFF)
+	t.PC = 0x38
+
+def op_illegal(t: opCodeTable): # D3, DB, DD, E3, E4, EB, EC, ED, F4, FC, FD
+	print("no code :(")
+	exit(1)
+
+HANDLERS = [op_illegal] * 0x100
+for code in range(0x100):
+	HANDLERS[code] = globals().get(f"op_{code:02X}", op_illegal)
@@ -1,16 +1,62 @@
 from itertools import cycle
+from functools import partial
+from bisect import insort
+from interrupts import INT_VBLANK, INT_STAT
 
+try:
+	import numpy
+except ImportError:
+	numpy = None # optional, for PPU.frame_array and the batched scanline renderer
+
+# PPU modes (what STAT bits 0 - 1 report)
+MODE_HBLANK = 0
+MODE_VBLANK = 1
+MODE_OAMSCAN = 2
+MODE_DRAW = 3
+
+# M-cycles from the start of a scanline to the end of OAMSCAN, DRAW and the whole line
+OAMSCAN_END = 40
+DRAW_END = 83
+LINE_END = 114
+
+# tiles in each VRAM bank (0x8000 - 0x97FF), the tile cache has room for the CGB's 2 banks
+TILES_PER_BANK = 384
+TILES = 2 * TILES_PER_BANK
+
+# smallest batch of lines worth drawing with numpy (fewer are drawn by render_line)
+NUMPY_MIN_LINES = 8
+
+# sprites in OAM, and the most OAM scan picks for one line
+SPRITES = 40
+SPRITES_PER_LINE = 10
+
+# LCD size in pixels
+SCREEN_WIDTH = 160
+SCREEN_HEIGHT = 144
+
+# shade -> RGBA (white, light grey, dark grey, black)
+SHADES_RGBA = [bytes([0xFF, 0xFF, 0xFF, 0xFF]), bytes([0xAA, 0xAA, 0xAA, 0xFF]), bytes([0x55, 0x55, 0x55, 0xFF]), bytes([0x00, 0x00, 0x00, 0xFF])]
+
+# palette register (BGP, OBP0, OBP1) -> bytes.translate table from colour number to shade
+PALETTES = [bytes([(palette >> shift) & 0x3 for shift in (0, 2, 4, 6)]) + bytes(252) for palette in range(256)]
 
 class PPU:
-	def __init__(self):
+	# renderer "fifo" runs the pixel fetcher every M-cycle of DRAW (mid-scanline register changes
+	# show up where they happened), "scanline" draws each line in one go when DRAW ends with the
+	# registers as they are at that point, which is a lot cheaper
+	def __init__(self, scheduler, request_interrupt, renderer: str = "fifo"):
+		self.scheduler = scheduler
+		self.request_interrupt = request_interrupt # sets a bit in IF
+
 		# 256 x 256 grid but displays 160 x 144 (32x32 -> 20x18 to tiles)
-		self.vram = [0] * 0x2000 # 0x8000 - 0x9FFF, Backgorund and Window
-		self.oam = [0] * 0xA0 # 0xFE00 - 0xFE9F, object attribute memory
+		# the one copy of VRAM and OAM, Memory maps memoryviews of them onto the bus
+		self.vram = bytearray(0x2000) # 0x8000 - 0x9FFF, Backgorund and Window
+		self.oam = bytearray(0xA0) # 0xFE00 - 0xFE9F, object attribute memory
 		
 		self.scanline_y = 0
 
 		'''
-		contains data used to display Sprites (also known as Objects) on screen. 
+		contains data used to display Sprites (also known as “Objects”) on screen. 
 		Each sprite takes up 4 bytes in this section of memory, allowing for a total of 40 sprites 
 		to be displayed at any given time
 		'''
@@ -26,7 +72,7 @@ class PPU:
 		value of 0 would fully hide the sprite.)
 		
 		Byte 2 - tile number (used for fetching the graphics data for the sprite. Note that sprites always use 
-		the 8000 addressing method, so this value is always interpreted as an unsigned 8-bit integer.)
+		the “8000 addressing method”, so this value is always interpreted as an unsigned 8-bit integer.)
 		
 		Byte 3 - sprite flags (from 7 to 0: OBJ-to-BG Priority, Y-flip, X-flip, pallete number, CGB-flags)
 		
@@ -40,8 +86,6 @@ class PPU:
 		self.LY = 0 # row
 		self.LX = 0 # col
 		self.FStep = 0 #bool for what stage in fethcing we're on
-		self.tLow = 0
-		self.tHigh = 0
 
 		self.LCDC = 0x0
 		self.LCDStat = 0x0
@@ -52,48 +96,172 @@ class PPU:
 		self.WX = 0x0 #0xFF4B, oam
 		self.WY = 0x0 #0xFF4A, oam
 		self.BGP = 0x0
-		self.frame = [[0] * 144] * 160 #LCD
-
-		self.m_cycles_passed = 0 # % 114
+		# LCD, 2 frame buffers of 160 x 144 shades (0 - 3, row after row). lines are drawn into back
+		# and the buffers swap at VBLANK, so front (and the views of it below) is the last whole
+		# frame until the next one is done
+		self.back = bytearray(SCREEN_WIDTH * SCREEN_HEIGHT)
+		self.front = bytearray(SCREEN_WIDTH * SCREEN_HEIGHT)
+		self.frame = memoryview(self.front).cast("B", (SCREEN_HEIGHT, SCREEN_WIDTH)) # frame[y, x]
+		self.frame_array = self.array_view(self.front) # the same as a numpy array (if numpy is installed)
+		self.rgba = bytearray(SCREEN_WIDTH * SCREEN_HEIGHT * 4)
+		self.window_line = 0 # line of the window the next line that shows it draws
+
+		# sprite index, OAM scan without scanning: line_sprites[ly] is every sprite (OAM index) whose
+		# Y range covers line ly in OAM order and sprite_lines[n] is the lines sprite n covers. OAM
+		# and LCDC writes keep them up to date (write_oam, oam_written, write_LCDC), so OAM has to be
+		# written through those. line_selection[ly] is what OAM scan picks for the line (see
+		# sprites_on_line), None until it is asked for after a change
+		self.line_sprites = [[] for _ in range(SCREEN_HEIGHT)]
+		self.sprite_lines = [range(0)] * SPRITES
+		self.line_selection = [None] * SCREEN_HEIGHT
+		self.sprite_buffer = [] # the sprites of the line being drawn
+
+		# the mode changes and new scanlines are scheduled events (see start_draw, start_hblank
+		# and next_line), the fetcher is caught up separately (see sync)
+		self.mode = MODE_OAMSCAN
+		self.line_start = 0 # Memory.cycles the current scanline started at
+		self.drawn = 0 # M-cycles of the current scanline the fetcher has been run for
+		self.scheduler.schedule(OAMSCAN_END, self.start_draw)
 		#OAM 40
 		#Draw +43
 		#H-blank +31
 		self.LYC = 0
 		#LYC > 160 -> V-blank
+		self.stat_line = False # any of the STAT interrupt sources selected in LCDStat is true (see update_stat)
 		self.BGFIFO = []
 		self.SprFIFO = []
 
+		# tile cache: every tile decoded to 64 colour numbers (8 rows of 8), and again with each row
+		# mirrored for X-flipped sprites. a tile is decoded the first time it is drawn after it was
+		# written to, so VRAM has to be written through write_vram
+		self.tile_pixels = bytearray(TILES * 64)
+		self.tile_pixels_flipped = bytearray(TILES * 64)
+		self.tile_stale = bytearray(b"\x01" * TILES)
+		self.TILE_NUMBER = 0 # latched by the fetcher between its two steps
+		self.fetcherX = 0
+		self.rendered_window_on_scanline = False
+
+		# lines the numpy renderer hasn't drawn yet (first, end), None if there are none (see defer_line)
+		self.pending = None
+		self.pending_end = 0
+
+		if renderer == "scanline":
+			# nothing to catch up on, lines are drawn whole when their DRAW ends. with numpy they are
+			# drawn in batches (defer_line), without it one by one (render_line)
+			self.sync = self.sync_scanline
+			self.finish_draw = self.defer_line if numpy is not None else self.render_line
+		else:
+			self.finish_draw = self.sync
+
 		#TILE 8x8 pixels
 		#TILE_NUMBER = unsigned byte
 		#tile = TILE_NUMBER * 16 (8010 = tile 1)
 		#signed variant does the same and uses 9000 as a base
 
+	def map_io(self, mem):
+		# the registers that change what the background and window look like go through write_register
+		for addr, name in ((0xFF42, "SCY"), (0xFF43, "SCX"), (0xFF47, "BGP"), (0xFF4A, "WY"), (0xFF4B, "WX")):
+			mem.map_io(addr, partial(getattr, self, name), partial(self.write_register, name))
+		mem.map_io(0xFF40, lambda: self.LCDC, self.write_LCDC)
+		mem.map_io(0xFF41, self.read_STAT, self.write_STAT)
+		mem.map_io(0xFF44, lambda: self.LY) # read only
+		mem.map_io(0xFF45, lambda: self.LYC, self.write_LYC)
+
+	def write_register(self, name: str, value: int):
+		# lines that are waiting to be drawn still get the old value
+		self.flush_lines()
+		setattr(self, name, value)
+
+	def write_LCDC(self, value: int):
+		changed = self.LCDC ^ value
+		self.write_register("LCDC", value)
+		if changed & 0x04:
+			# the sprite height changed, every sprite covers different lines now
+			self.oam_written()
+
+	def index_sprite(self, sprite: int):
+		# moves sprite to the lines its Y (and the sprite height) covers now
+		height = 16 if self.LCDC & 0x04 else 8
+		top = self.oam[sprite * 4] - 16
+		lines = range(max(top, 0), min(top + height, SCREEN_HEIGHT))
+		old = self.sprite_lines[sprite]
+		if lines == old:
+			return
+		for ly in old:
+			self.line_sprites[ly].remove(sprite)
+			self.line_selection[ly] = None
+		for ly in lines:
+			insort(self.line_sprites[ly], sprite)
+			self.line_selection[ly] = None
+		self.sprite_lines[sprite] = lines
+
+	def write_oam(self, offset: int, value: int):
+		# offset from 0xFE00, every sprite is Y, X, tile number and flags
+		self.oam[offset] = value
+		sprite = offset >> 2
+		if offset & 0x3 == 0:
+			self.index_sprite(sprite)
+		elif offset & 0x3 == 1:
+			# same lines, but their drawing order may have changed
+			for ly in self.sprite_lines[sprite]:
+				self.line_selection[ly] = None
+
+	def oam_written(self):
+		# after more of OAM than write_oam knows about changed (DMA)
+		for sprite in range(SPRITES):
+			self.index_sprite(sprite)
+		self.line_selection = [None] * SCREEN_HEIGHT
+
+	def sprites_on_line(self, ly: int) -> list:
+		# the sprites OAM scan picks for line ly (the first 10 in OAM order that cover it, X doesn't
+		# matter) in drawing priority order: smaller X first, OAM order when X is the same
+		selection = self.line_selection[ly]
+		if selection is None:
+			oam = self.oam
+			selection = sorted(self.line_sprites[ly][:SPRITES_PER_LINE], key=lambda sprite: (oam[sprite * 4 + 1], sprite))
+			self.line_selection[ly] = selection
+		return selection
+
+	def read_STAT(self) -> int:
+		# bit 7 is unused and reads as 1, bit 2 is LY == LYC, bits 0 - 1 are the mode
+		return 0x80 | (self.LCDStat & 0x78) | ((self.LY == self.LYC) << 2) | self.mode
+
+	def write_STAT(self, value: int):
+		# only the interrupt selects (bits 3 - 6) can be written
+		self.LCDStat = value & 0x78
+		self.update_stat()
+
+	def write_LYC(self, value: int):
+		self.LYC = value
+		self.update_stat()
+
+	def update_stat(self):
+		# the STAT interrupt is requested when the selected sources (LCDStat bits 3 - 6: H-blank, V-blank,
+		# OAM scan, LY == LYC) go from none of them being true to any of them, so back to back sources
+		# only request it once. called whenever the mode, LY, LYC or the selects change
+		stat = self.LCDStat
+		mode = self.mode
+		line = bool((stat & 0x40 and self.LY == self.LYC) or (stat & 0x08 and mode == MODE_HBLANK)
+			or (stat & 0x10 and mode == MODE_VBLANK) or (stat & 0x20 and mode == MODE_OAMSCAN))
+		if line and not self.stat_line:
+			self.request_interrupt(INT_STAT)
+		self.stat_line = line
+
 	def sprite_fetcher(self):
 		if self.FStep:
 			TILE_MAP = 0x9800
 
-			tile_x = (self.LX + (self.SCX / 8)) & 0x1F
-			tile_y = 32 * (((self.LY + self.SCY) & 0xFF) / 8)
-
-			TILE_NUMBER = self.vram[((TILE_MAP + ((tile_x + tile_y) & 0x3FF)) - 0x8000)] #from sprite buffer
-			offset = 2 * ((self.LY + self.SCY) % 8)
+			tile_x = (self.LX + (self.SCX // 8)) & 0x1F
+			tile_y = 32 * (((self.LY + self.SCY) & 0xFF) // 8)
 
-			tile = 0x8000 + (TILE_NUMBER * 16)
-
-			self.tLow = self.vram[((tile + offset) - 0x8000)]
+			self.TILE_NUMBER = self.vram[((TILE_MAP + ((tile_x + tile_y) & 0x3FF)) - 0x8000)] #from sprite buffer
 			
 			self.FStep = not self.FStep
 
 		else:
-			offset = 2 * ((self.LY + self.SCY) % 8)
-
-			tile = 0x8000 + (TILE_NUMBER * 16)
-
-			self.tHigh = self.vram[((tile + offset) - 0x8000)]
-
 			if len(self.SprFIFO) <= 8:
-				for i in range(8):
-					self.SprFIFO[i] = ((((self.tHigh >> (7 - i)) & 0x1) << 1) | ((self.tLow >> (7 - i)) & 0x1)) 		
+				# sprites always use the 0x8000 addressing, the row comes decoded from the tile cache
+				self.SprFIFO.extend(self.tile_pixels_row(self.TILE_NUMBER, (self.LY + self.SCY) % 8))
 			self.fetcherX += 1
 			
 			self.FStep = not self.FStep
@@ -102,38 +270,19 @@ class PPU:
 		if self.FStep: #steps 1 & 2
 			TILE_MAP = 0x9800
 
-			tile_x = (self.LX + (self.SCX / 8)) & 0x1F
-			tile_y = 32 * (((self.LY + self.SCY) & 0xFF) / 8)
+			tile_x = (self.LX + (self.SCX // 8)) & 0x1F
+			tile_y = 32 * (((self.LY + self.SCY) & 0xFF) // 8)
 
-			TILE_NUMBER = self.vram[((TILE_MAP + ((tile_x + tile_y) & 0x3FF)) - 0x8000)]
+			self.TILE_NUMBER = self.vram[((TILE_MAP + ((tile_x + tile_y) & 0x3FF)) - 0x8000)]
 			#32 * (WINDOW_LINE_COUNTER / 8)
-
-			offset = 2 * ((self.LY + self.SCY) % 8)
-			#2 * (WINDOW_LINE_COUNTER % 8)
-			
-			if((self.LCDC >> 4) & 1):
-				tile = 0x8000 + (TILE_NUMBER * 16)
-			else:
-				tile = (0x9000 + (TILE_NUMBER * 16)) & 0xFFFF
-
-			self.tLow = self.vram[((tile + offset) - 0x8000)]
 			
 			self.FStep = not self.FStep 
 
 		else:
-			offset = 2 * ((self.LY + self.SCY) % 8)
-
-			if((self.LCDC >> 4) & 1):
-				tile = 0x8000 + (TILE_NUMBER * 16)
-			else:
-				tile = (0x9000 + (TILE_NUMBER * 16)) & 0xFFFF
-
-
-			self.tHigh = self.vram[((tile + offset) - 0x8000)]
-
+			#2 * (WINDOW_LINE_COUNTER % 8)
 			if len(self.BGFIFO) <= 8:
-				for i in range(8):
-					self.BGFIFO[i] = ((((self.tHigh >> (7 - i)) & 0x1) << 1) | ((self.tLow >> (7 - i)) & 0x1)) 		
+				# the row comes decoded from the tile cache
+				self.BGFIFO.extend(self.tile_pixels_row(self.tile_index(self.TILE_NUMBER), (self.LY + self.SCY) % 8))
 			self.fetcherX += 1
 			
 			self.FStep = not self.FStep
@@ -145,7 +294,8 @@ class PPU:
 		pass
 
 	def OAMSCAN(self):
-		pass
+		# the sprites for the line come out of the sprite index
+		self.sprite_buffer = self.sprites_on_line(self.LY)
 
 	def DRAW(self):
 		'''
@@ -165,7 +315,7 @@ class PPU:
 
 		if len(self.BGFIFO) >= 8:
 
-			if (self.tick_state.scanline_x == 0) and not self.rendered_window_on_scanline:
+			if (self.LX == 0) and not self.rendered_window_on_scanline:
 				for _ in range(self.SCX % 8):
 					self.BGFIFO.pop(0);
 			#at the start of each scanline discard SCX mod 8 pixels from FIFO and push the rest to LCD 
@@ -179,25 +329,234 @@ class PPU:
 
 		pass
 
-	def tick(self):
-		if self.LYC >= 160:
-			self.VBLANK()
-		else:
-			scanline_cycles = self.m_cycles_passed % 114
-
-			if scanline_cycles < 40:
-				self.OAMSCAN()
-			if scanline_cycles < 83:
+	def sync(self, now: int):
+		# runs the fetcher for the cycles of the current scanline up to now, it steps every M-cycle
+		# from the start of the line to the end of DRAW
+		if self.LY < 144:
+			end = min(now - self.line_start, DRAW_END)
+			for _ in range(end - self.drawn):
 				self.DRAW()
-			else:
-				self.HBLANK()
+			if end > self.drawn:
+				self.drawn = end
+
+	@staticmethod
+	def array_view(buffer):
+		# 144 x 160 numpy array over buffer (no copy), None without numpy
+		if numpy is None:
+			return None
+		return numpy.frombuffer(buffer, dtype=numpy.uint8).reshape(SCREEN_HEIGHT, SCREEN_WIDTH)
+
+	def swap_buffers(self):
+		self.front, self.back = self.back, self.front
+		self.frame = memoryview(self.front).cast("B", (SCREEN_HEIGHT, SCREEN_WIDTH))
+		self.frame_array = self.array_view(self.front)
+
+	def frame_rgba(self) -> memoryview:
+		# the front buffer as 160 x 144 RGBA pixels (4 bytes each), converted when called
+		self.rgba[:] = b"".join(map(SHADES_RGBA.__getitem__, self.front))
+		return memoryview(self.rgba)
+
+	def sync_scanline(self, now: int):
+		pass
 
+	def write_vram(self, offset: int, value: int):
+		# offset from 0x8000, only 0x8000 - 0x97FF is tile data
+		if self.pending is not None:
+			self.flush_lines()
+		self.vram[offset] = value
+		if offset < 0x1800:
+			self.tile_stale[offset >> 4] = 1
+
+	def decode_tile(self, tile: int):
+		# tiles 0 - 383 are VRAM bank 0, 384 - 767 would be bank 1 on the CGB
+		vram = self.vram
+		base = (tile // TILES_PER_BANK) * 0x2000 + (tile % TILES_PER_BANK) * 16
+		pixels = self.tile_pixels
+		flipped = self.tile_pixels_flipped
+		for row in range(8):
+			low = vram[base + row * 2]
+			high = vram[base + row * 2 + 1] << 1
+			start = tile * 64 + row * 8
+			for x in range(8):
+				colour = ((high >> (7 - x)) & 0x2) | ((low >> (7 - x)) & 0x1)
+				pixels[start + x] = colour
+				flipped[start + 7 - x] = colour
+		self.tile_stale[tile] = 0
+
+	def tile_index(self, number: int) -> int:
+		# tile number from a tile map -> tile, the 0x8000 addressing (0 - 255) or the 0x8800 one
+		# (signed, 0 is the tile at 0x9000)
+		if self.LCDC & 0x10:
+			return number
+		return (number ^ 0x80) + 0x80
+
+	def tile_pixels_row(self, tile: int, row: int) -> bytearray:
+		if self.tile_stale[tile]:
+			self.decode_tile(tile)
+		start = tile * 64 + row * 8
+		return self.tile_pixels[start:start + 8]
+
+	def tile_row(self, tile_map: int, first: int, count: int, row: int) -> bytearray:
+		# colour numbers of count tiles from the tile map at offset tile_map (one row of 32 tiles,
+		# starting at tile first and wrapping around), row is the line inside the tiles
+		vram = self.vram
+		unsigned = self.LCDC & 0x10
+		stale = self.tile_stale
+		pixels = self.tile_pixels
+		row *= 8
+		line = bytearray()
+		for i in range(count):
+			tile = vram[tile_map + ((first + i) & 0x1F)]
+			if not unsigned:
+				tile = (tile ^ 0x80) + 0x80
+			if stale[tile]:
+				self.decode_tile(tile)
+			start = tile * 64 + row
+			line += pixels[start:start + 8]
+		return line
+
+	def render_line(self, when: int):
+		# the scanline renderer, background and window of line LY into frame
+		lcdc = self.LCDC
+		start = self.LY * SCREEN_WIDTH
+		if not lcdc & 0x01:
+			# background and window off
+			self.back[start:start + SCREEN_WIDTH] = bytes(SCREEN_WIDTH)
+			return
+
+		# background, the 21 tiles that cover the line and SCX % 8 pixels cut off the front
+		y = (self.LY + self.SCY) & 0xFF
+		tile_map = (0x1C00 if lcdc & 0x08 else 0x1800) + (y >> 3) * 32
+		fine_x = self.SCX & 0x7
+		line = self.tile_row(tile_map, self.SCX >> 3, 21, y & 0x7)[fine_x:fine_x + 160]
+
+		# window, from WX - 7 to the end of the line
+		x = self.WX - 7
+		if lcdc & 0x20 and self.LY >= self.WY and x < 160:
+			y = self.window_line
+			tile_map = (0x1C00 if lcdc & 0x40 else 0x1800) + (y >> 3) * 32
+			window = self.tile_row(tile_map, 0, 21, y & 0x7)
+			if x < 0:
+				line[:] = window[-x:160 - x]
+			else:
+				line[x:] = window[:160 - x]
+			self.window_line += 1
+
+		self.back[start:start + SCREEN_WIDTH] = line.translate(PALETTES[self.BGP])
+
+	def defer_line(self, when: int):
+		# the numpy renderer: a line isn't drawn when its DRAW ends but when something it depends
+		# on is about to change (a register in write_register, VRAM) or at VBLANK, so the lines in
+		# between come out of one batch. a frame without mid-frame changes is a single batch
+		if self.pending is None:
+			self.pending = self.LY
+		self.pending_end = self.LY + 1
+
+	def flush_lines(self):
+		if self.pending is None:
+			return
+		first, end = self.pending, self.pending_end
+		self.pending = None
+		if end - first >= NUMPY_MIN_LINES:
+			self.render_lines(first, end)
+			return
+		# numpy has a fixed cost per call, a few lines are quicker one by one
+		ly = self.LY
+		for line in range(first, end):
+			self.LY = line
+			self.render_line(0)
+		self.LY = ly
+
+	def decode_stale_tiles(self):
+		# decode_tile for every stale tile at once
+		stale = numpy.flatnonzero(numpy.frombuffer(self.tile_stale, dtype=numpy.uint8)[:TILES_PER_BANK])
+		if not len(stale):
+			return
+		data = numpy.frombuffer(self.vram, dtype=numpy.uint8)[:0x1800].reshape(TILES_PER_BANK, 8, 2)[stale]
+		# bit 7 is the leftmost pixel, the second byte of each row has the high bits
+		colours = (numpy.unpackbits(data[:, :, 1:2], axis=2) << 1) | numpy.unpackbits(data[:, :, 0:1], axis=2)
+		numpy.frombuffer(self.tile_pixels, dtype=numpy.uint8).reshape(TILES, 8, 8)[stale] = colours
+		numpy.frombuffer(self.tile_pixels_flipped, dtype=numpy.uint8).reshape(TILES, 8, 8)[stale] = colours[:, :, ::-1]
+		numpy.frombuffer(self.tile_stale, dtype=numpy.uint8)[stale] = 0
+
+	def tile_indices(self, numbers):
+		# tile_index for an array of tile numbers
+		numbers = numbers.astype(numpy.intp)
+		if self.LCDC & 0x10:
+			return numbers
+		return (numbers ^ 0x80) + 0x80
+
+	def map_pixels(self, tile_map: int, y, x):
+		# colour numbers at (y, x) of the 256 x 256 pixel background at offset tile_map, for every
+		# y (rows of the result) and x (columns)
+		vram = numpy.frombuffer(self.vram, dtype=numpy.uint8)
+		tiles = numpy.frombuffer(self.tile_pixels, dtype=numpy.uint8).reshape(TILES, 8, 8)
+		numbers = vram[tile_map:tile_map + 0x400].reshape(32, 32)[(y >> 3)[:, None], (x >> 3)[None, :]]
+		return tiles[self.tile_indices(numbers), (y & 0x7)[:, None], (x & 0x7)[None, :]]
+
+	def render_lines(self, first: int, end: int):
+		# render_line for lines first to end - 1 with numpy, all of them with the registers as they are now
+		out = numpy.frombuffer(self.back, dtype=numpy.uint8).reshape(SCREEN_HEIGHT, SCREEN_WIDTH)[first:end]
+		lcdc = self.LCDC
+		if not lcdc & 0x01:
+			out[:] = 0
+			return
+		self.decode_stale_tiles()
+
+		lines = numpy.arange(first, end)
+		y = (lines + self.SCY) & 0xFF
+		x = (numpy.arange(SCREEN_WIDTH) + self.SCX) & 0xFF
+		colours = self.map_pixels(0x1C00 if lcdc & 0x08 else 0x1800, y, x)
+
+		# the window is on every line from WY on, those come one after the other so their window
+		# lines do too
+		left = self.WX - 7
+		if lcdc & 0x20 and left < SCREEN_WIDTH:
+			shown = lines >= self.WY
+			count = int(shown.sum())
+			if count:
+				y = self.window_line + numpy.arange(count)
+				x = numpy.arange(max(left, 0), SCREEN_WIDTH) - left
+				colours[shown, max(left, 0):] = self.map_pixels(0x1C00 if lcdc & 0x40 else 0x1800, y, x)
+				self.window_line += count
+
+		out[:] = numpy.frombuffer(PALETTES[self.BGP], dtype=numpy.uint8)[colours]
+
+	def start_draw(self, when: int):
+		self.OAMSCAN()
+		self.mode = MODE_DRAW
+		self.update_stat()
+		self.scheduler.schedule(when + DRAW_END - OAMSCAN_END, self.start_hblank)
+
+	def start_hblank(self, when: int):
+		self.finish_draw(when)
+		self.mode = MODE_HBLANK
+		self.update_stat()
+		self.scheduler.schedule(when + LINE_END - DRAW_END, self.next_line)
+
+	def next_line(self, when: int):
 		# END OF SCANLINE RESET SCANLINE_Y TO 0
-
+		self.line_start = when
+		self.drawn = 0
+		self.LY = (self.LY + 1) % 154
+		self.LX = 0
+		if self.LY < 144:
+			self.mode = MODE_OAMSCAN
+			self.update_stat()
+			self.scheduler.schedule(when + OAMSCAN_END, self.start_draw)
+			return
+		if self.LY == 144:
+			self.mode = MODE_VBLANK
+			self.flush_lines()
+			self.window_line = 0
+			self.swap_buffers()
+			self.request_interrupt(INT_VBLANK)
+		self.update_stat()
+		self.scheduler.schedule(when + LINE_END, self.next_line)
 
 	'''
-	a scanline is simply a row of pixels on the screen. The PPU goes from left to 
-	right along the scanline and places the pixels one by one, and once its done, it continues 
+	a “scanline” is simply a row of pixels on the screen. The PPU goes from left to 
+	right along the scanline and places the pixels one by one, and once it’s done, it continues 
 	to the next scanline. Do note that the PPU operates on a pixel-basis, and not on a tile-basis.
 	
 	Each scan line takes 45d t-cycles
@@ -205,16 +564,16 @@ class PPU:
 
 	PPU modes: 2->3->0->2 (1 occurs at the end of every frame)
 		0: H-blank - This mode takes up the remainder of the scanline after the Drawing Mode finishes, 
-		more or less padding the duration of the scanline to a total of 456 T-Cycles. The PPU effectively 
+		more or less “padding” the duration of the scanline to a total of 456 T-Cycles. The PPU effectively 
 		pauses during this mode.
 		
 		1: V-blank - the same as H-Blank in the way that the PPU does not draw any pixels to the LCD during its 
-		duration. However, instead of it taking place at the end of every scanline, its a much longer period at the end of 
+		duration. However, instead of it taking place at the end of every scanline, it’s a much longer period at the end of 
 		every frame (execute at scanline 160)
 		
 		As the Gameboy has a vertical resolution of 144 pixels, it would be expected that the amount of scanlines the PPU 
 		handles would be equal - 144 scanlines. However, this is not the case. In reality there are 154 scanlines, the 10 
-		last of which being pseudo-scanlines during which no pixels are drawn as the PPU is in the V-Blank state during 
+		last of which being “pseudo-scanlines” during which no pixels are drawn as the PPU is in the V-Blank state during 
 		their duration. A V-Blank scanline takes the same amount of time as any other scanline - 456 T-Cycles.
 
 		2: OAM scan - This mode is entered at the start of every scanline (except for V-Blank) 
@@ -0,0 +1,72 @@
+# the CB-prefixed table is completely regular, so instead of writing 256 arms by hand
+# we build one small function per opcode from its encoding:
+#   bits 7-6: group (0 = rotate/shift, 1 = BIT, 2 = RES, 3 = SET)
+#   bits 5-3: which rotate/shift for group 0, otherwise the bit number
+#   bits 2-0: target register (B, C, D, E, H, L, (HL), A)
+# each handler is generated as python source and compiled once at import, so the
+# register access and the operation are baked in and nothing is decided at runtime
+# flags are written straight into t.f (Z=0x80, N=0x40, H=0x20, C=0x10) and t.flag_op
+# is cleared (0 = FLAGS_DONE in opcodeCases) so the lazy flag record is dropped
+
+# (code that loads the target into v, code that stores v back into the target)
+TARGETS = [
+	("v = t.b", "t.b = v"),
+	("v = t.c", "t.c = v"),
+	("v = t.d", "t.d = v"),
+	("v = t.e", "t.e = v"),
+	("v = t.h", "t.h = v"),
+	("v = t.l", "t.l = v"),
+	("v = t.mem.read((t.h << 8) | t.l)", "t.mem.write((t.h << 8) | t.l, v)"),
+	("v = t.a", "t.a = v"),
+]
+TARGET_NAMES = ["B", "C", "D", "E", "H", "L", "(HL)", "A"]
+
+# rotates and shifts (group 0), each computes the new v and the carry out c
+SHIFTS = [
+	("RLC", ["c = v >> 7", "v = ((v << 1) | c) & 0xFF"]),
+	("RRC", ["c = v & 1", "v = (v >> 1) | (c << 7)"]),
+	("RL", ["c = v >> 7", "v = ((v << 1) | t.C) & 0xFF"]),
+	("RR", ["c = v & 1", "v = (v >> 1) | (t.C << 7)"]),
+	("SLA", ["c = v >> 7", "v = (v << 1) & 0xFF"]),
+	("SRA", ["c = v & 1", "v = (v >> 1) | (v & 0x80)"]),
+	("SWAP", ["c = 0", "v = ((v << 4) | (v >> 4)) & 0xFF"]),
+	("SRL", ["c = v & 1", "v = v >> 1"]),
+]
+
+def prefixed_source(code: int) -> str:
+	group = code >> 6
+	y = (code >> 3) & 7
+	load, store = TARGETS[code & 7]
+
+	if group == 0:
+		name, op = SHIFTS[y]
+		body = [load] + op + [
+			store,
+			"t.flag_op = 0",
+			"t.f = (c << 4) if v else 0x80 | (c << 4)",
+		]
+	elif group == 1:
+		# BIT only reads the target, C is left alone
+		name = f"BIT {y},"
+		body = [
+			load,
+			f"t.f = (t.flag_bits() & 0x10) | (0x20 if (v >> {y}) & 1 else 0xA0)",
+		]
+	elif group == 2:
+		name = f"RES {y},"
+		body = [load, f"v &= {~(1 << y) & 0xFF:#04x}", store]
+	else:
+		name = f"SET {y},"
+		body = [load, f"v |= {1 << y:#04x}", store]
+
+	lines = [f"def cb_{code:02X}(t): # {name} {TARGET_NAMES[code & 7]}"]
+	lines += ["\t" + line for line in body]
+	return "\n".join(lines) + "\n"
+
+def build_prefixed_handlers() -> list:
+	namespace = {}
+	for code in range(0x100):
+		exec(compile(prefixed_source(code), f"<cb_{code:02X}>", "exec"), namespace)
+	return [namespace[f"cb_{code:02X}"] for code in range(0x100)]
+
+PREFIXED_HANDLERS = build_prefixed_handlers()
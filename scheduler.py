@@ -0,0 +1,37 @@
+import heapq
+
+NEVER = float("inf")
+
+class Scheduler:
+    # everything the components do at a known point in time (PPU mode changes and new scanlines,
+    # TIMA overflowing, frame sequencer steps, serial transfers finishing) is an event in here,
+    # keyed by the value of Memory.cycles it is due at. the CPU runs instructions until the
+    # earliest one (deadline) and then runs every event that is due, each event schedules the
+    # next one itself
+    def __init__(self):
+        # heap of [cycle, order, callback], order keeps events due at the same cycle in the order
+        # they were scheduled. cancelled events stay in the heap with callback set to None
+        self.events = []
+        self.order = 0
+        self.deadline = NEVER
+
+    def schedule(self, cycle: int, callback) -> list:
+        # callback(cycle) runs once Memory.cycles reaches cycle, returns a handle for cancel()
+        event = [cycle, self.order, callback]
+        self.order += 1
+        heapq.heappush(self.events, event)
+        if cycle < self.deadline:
+            self.deadline = cycle
+        return event
+
+    def cancel(self, event: list):
+        event[2] = None
+
+    def run(self, now: int):
+        # runs every event due at or before now (including ones they schedule)
+        events = self.events
+        while events and events[0][0] <= now:
+            cycle, _, callback = heapq.heappop(events)
+            if callback is not None:
+                callback(cycle)
+        self.deadline = events[0][0] if events else NEVER
@@ -0,0 +1,32 @@
+from interrupts import INT_SERIAL
+
+# M-cycles to shift out a byte with the internal 8192 Hz clock
+TRANSFER_CYCLES = 1024
+
+class Serial:
+    # link port with nothing plugged in: every byte sent comes back as 0xFF
+    def __init__(self, scheduler, request_interrupt):
+        self.scheduler = scheduler
+        self.request_interrupt = request_interrupt
+        self.SB = 0x0 # 0xFF01, serial transfer data
+        self.SC = 0x0 # 0xFF02, serial transfer control (bit 7 = transfer in progress, bit 0 = internal clock)
+
+        # every byte the game sent, test ROMs print their results this way
+        self.output = []
+
+    def map_io(self, mem):
+        mem.map_register(0xFF01, self, "SB")
+        # the unused bits of SC read as 1
+        mem.map_io(0xFF02, lambda: self.SC | 0x7E, lambda value: self.write_SC(value, mem.cycles))
+
+    def write_SC(self, value: int, now: int):
+        self.SC = value
+        if value & 0x81 == 0x81:
+            # with an external clock the transfer would wait for the other Gameboy forever
+            self.output.append(self.SB)
+            self.scheduler.schedule(now + TRANSFER_CYCLES, self.transfer_done)
+
+    def transfer_done(self, when: int):
+        self.SB = 0xFF
+        self.SC &= 0x7F
+        self.request_interrupt(INT_SERIAL)
@@ -0,0 +1,159 @@
+from opcodeCases import opCodeTable, i8
+
+# games and test ROMs spend a lot of every frame in loops like
+#   LDH A, (44h) / CP n / JR NZ, -6
+# that just read something until it changes. if a loop doesn't write memory or touch the stack,
+# and the registers are the same at the start of two iterations in a row, every iteration after
+# that does exactly the same thing until something outside the CPU changes (LY, ...). so those
+# iterations are skipped: the clock jumps ahead to the next event in whole iterations.
+
+# opcodes that can appear in such a loop -> length in bytes
+# (no memory writes, stack, calls/returns, HALT/STOP or ime changes)
+SPIN_SAFE = {0x00: 1}
+for code in range(0x40, 0xC0):
+    if not 0x70 <= code <= 0x77: # LD (HL), r and HALT
+        SPIN_SAFE[code] = 1 # LD r, r' and ALU A, r
+for code in [0x07, 0x0F, 0x17, 0x1F, 0x27, 0x2F, 0x37, 0x3F, 0x0A, 0x1A, 0x2A, 0x3A, 0xF2, 0xF9]:
+    SPIN_SAFE[code] = 1
+for base in range(0x00, 0x40, 0x10):
+    SPIN_SAFE[base + 0x01] = 3 # LD rr, nn
+    SPIN_SAFE[base + 0x03] = 1 # INC rr
+    SPIN_SAFE[base + 0x09] = 1 # ADD HL, rr
+    SPIN_SAFE[base + 0x0B] = 1 # DEC rr
+for code in range(0x04, 0x40, 0x08):
+    if code != 0x34: # INC (HL), DEC (HL), LD (HL), n
+        SPIN_SAFE[code] = 1
+        SPIN_SAFE[code + 1] = 1
+        SPIN_SAFE[code + 2] = 2
+for code in [0xC6, 0xCE, 0xD6, 0xDE, 0xE6, 0xEE, 0xF6, 0xFE, 0xF0, 0xE8, 0xF8]:
+    SPIN_SAFE[code] = 2
+SPIN_SAFE[0xFA] = 3 # LD A, (nn)
+
+JR_CODES = [0x18, 0x20, 0x28, 0x30, 0x38]
+JP_CODES = [0xC3, 0xC2, 0xCA, 0xD2, 0xDA]
+for code in JR_CODES:
+    SPIN_SAFE[code] = 2
+for code in JP_CODES:
+    SPIN_SAFE[code] = 3
+
+MAX_LOOP_BYTES = 32
+
+# loop opcodes reading memory through a register: LD A, (BC/DE/HL+/HL-/C), LD r, (HL), ALU A, (HL)
+INDIRECT_READS = {0x0A, 0x1A, 0x2A, 0x3A, 0xF2}
+INDIRECT_READS.update(range(0x46, 0x80, 0x08))
+INDIRECT_READS.update(range(0x86, 0xC0, 0x08))
+
+def find_spin_loop(peek, start: int) -> int:
+    # end of the loop (address after the jump back to start), None if start doesn't begin a safe loop
+    pc = start
+    while pc - start < MAX_LOOP_BYTES:
+        code = peek(pc & 0xFFFF)
+        if code == 0xCB:
+            # only BIT reads (HL), every other CB op on (HL) writes it back
+            cb = peek((pc + 1) & 0xFFFF)
+            if cb >> 6 != 1 and cb & 7 == 6:
+                return None
+            pc += 2
+            continue
+
+        length = SPIN_SAFE.get(code)
+        if length is None:
+            return None
+        target = None
+        if code in JR_CODES:
+            target = (pc + 2 + i8(peek((pc + 1) & 0xFFFF))) & 0xFFFF
+        elif code in JP_CODES:
+            target = (peek((pc + 2) & 0xFFFF) << 8) | peek((pc + 1) & 0xFFFF)
+        pc += length
+
+        if target == start:
+            return pc
+        if code == 0x18 or code == 0xC3:
+            # always jumps somewhere else, can't loop back to start
+            return None
+    return None
+
+def reads_timer(code: bytes) -> bool:
+    # whether a loop could read DIV or TIMA, anything reading through a register pair (or (C)) might
+    pc = 0
+    while pc < len(code):
+        op = code[pc]
+        if op == 0xCB:
+            if code[pc + 1] & 7 == 6:
+                return True
+            pc += 2
+            continue
+        if op in INDIRECT_READS:
+            return True
+        if op == 0xF0 and code[pc + 1] in (0x04, 0x05):
+            return True
+        if op == 0xFA and code[pc + 1] in (0x04, 0x05) and code[pc + 2] == 0xFF:
+            return True
+        pc += SPIN_SAFE[op]
+    return False
+
+class SpinLoops:
+    def __init__(self, table: opCodeTable):
+        self.table = table
+        self.mem = table.mem
+        # (bank, pc) -> (end, bytes of the loop) or None if pc doesn't start a spin loop
+        self.loops = {}
+        # (start, registers, cycle) at the start of the last iteration of the loop we might be in
+        self.last = None
+
+    def skip(self, jumped_from: int, deadline: int) -> int:
+        # called after a backward jump, skips iterations up to the next event (deadline) at most
+        # returns the M-cycles that were skipped (already spent through Memory.advance)
+        mem = self.mem
+        t = self.table
+        start = t.PC
+        now = mem.cycles
+
+        key = (mem.banks[start >> 13], start)
+        try:
+            loop = self.loops[key]
+        except KeyError:
+            loop = self.loops[key] = self.decode(start)
+        if loop is None or not start <= jumped_from < loop[0]:
+            self.last = None
+            return 0
+
+        registers = (t.a, t.flag_bits(), t.b, t.c, t.d, t.e, t.h, t.l, t.SP)
+        last = self.last
+        self.last = (start, registers, now)
+        if last is None or last[0] != start or last[1] != registers:
+            return 0
+
+        # RAM code can change under us, make sure it's still the same loop
+        if self.decode(start) != loop:
+            self.loops[key] = None
+            return 0
+
+        iteration = now - last[2]
+        if iteration <= 0:
+            return 0
+        # nothing the loop reads can change before the next event, skip every iteration up to it
+        cycles = deadline - now
+        if loop[2]:
+            # it might be reading DIV or TIMA, which change without an event
+            cycles = min(cycles, mem.cycles_until_event())
+        if mem.dma_end > last[2]:
+            # so does the bus at the end of an OAM DMA, iterations from before then don't say anything
+            # about the ones after
+            if mem.dma_end <= now:
+                return 0
+            cycles = min(cycles, mem.dma_end - now)
+        skipped = cycles // iteration * iteration
+        if skipped > 0:
+            mem.advance(skipped)
+            self.last = (start, registers, now + skipped)
+            return skipped
+        return 0
+
+    def decode(self, start: int) -> tuple:
+        # (end, bytes, whether the loop may read the timer) or None
+        end = find_spin_loop(self.mem.peek, start)
+        if end is None:
+            return None
+        code = bytes(self.mem.peek(addr & 0xFFFF) for addr in range(start, end))
+        return (end, code, reads_timer(code))
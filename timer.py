@@ -1,6 +1,84 @@
+from interrupts import INT_TIMER
+
+# M-cycles between TIMA increments for each TAC clock select (4096, 262144, 65536 and 16384 Hz)
+TIMA_PERIODS = [256, 4, 16, 64]
+
 class Timer:
-    def __init__(self):
-        self.TAC = 0x0
+    # DIV and TIMA aren't counted every cycle, sync works out how far they got since the last time
+    # and the only event is TIMA overflowing (which requests the timer interrupt)
+    def __init__(self, scheduler, request_interrupt):
+        self.scheduler = scheduler
+        self.request_interrupt = request_interrupt
+        self.counter = 0x0 # internal M-cycle counter, DIV (0xFF04) is bits 6 - 13
+        self.TIMA = 0x0 # 0xFF05, timer counter
+        self.TMA = 0x0 # 0xFF06, timer modulo (TIMA is reloaded with it when it overflows)
+        self.TAC = 0x0 # 0xFF07, timer control (bit 2 = enable, bits 0 - 1 = clock select)
+        self.synced = 0
+        self.overflow = None # the scheduled overflow event, if TIMA is counting
+        self.on_div_reset = None # called after DIV is written (the APU's frame sequencer runs off it)
+
+    @property
+    def DIV(self) -> int:
+        return self.counter >> 6
+
+    def map_io(self, mem):
+        mem.map_io(0xFF04, lambda: self.DIV, self.write_DIV)
+        mem.map_io(0xFF05, lambda: self.TIMA, self.write_TIMA)
+        mem.map_io(0xFF06, lambda: self.TMA, self.write_TMA)
+        # the unused bits of TAC read as 1
+        mem.map_io(0xFF07, lambda: self.TAC | 0xF8, self.write_TAC)
+
+    def sync(self, now: int):
+        # catches up to Memory.cycles
+        cycles = now - self.synced
+        self.synced = now
+        if self.TAC & 0x4:
+            period = TIMA_PERIODS[self.TAC & 0x3]
+            tima = self.TIMA + (self.counter + cycles) // period - self.counter // period
+            if tima > 0xFF:
+                tima = self.TMA + (tima - 0x100) % (0x100 - self.TMA)
+                self.request_interrupt(INT_TIMER)
+            self.TIMA = tima
+        self.counter = (self.counter + cycles) & 0x3FFF
+
+    def cycles_until_change(self) -> int:
+        # M-cycles until DIV or TIMA changes (once synced)
+        cycles = 64 - (self.counter & 0x3F)
+        if self.TAC & 0x4:
+            period = TIMA_PERIODS[self.TAC & 0x3]
+            cycles = min(cycles, period - self.counter % period)
+        return cycles
+
+    def schedule_overflow(self):
+        # call after sync whenever TIMA, TMA, TAC or DIV changed
+        if self.overflow is not None:
+            self.scheduler.cancel(self.overflow)
+            self.overflow = None
+        if self.TAC & 0x4:
+            period = TIMA_PERIODS[self.TAC & 0x3]
+            cycles = (0x100 - self.TIMA) * period - self.counter % period
+            self.overflow = self.scheduler.schedule(self.synced + cycles, self.overflowed)
+
+    def overflowed(self, when: int):
+        # a register access during the instruction may have synced past the overflow already
+        self.overflow = None
+        self.sync(max(when, self.synced))
+        self.schedule_overflow()
+
+    def write_DIV(self, value: int):
+        # writing anything resets it
+        self.counter = 0
+        self.schedule_overflow()
+        if self.on_div_reset is not None:
+            self.on_div_reset()
+
+    def write_TIMA(self, value: int):
+        self.TIMA = value
+        self.schedule_overflow()
+
+    def write_TMA(self, value: int):
+        self.TMA = value
 
-    def tick(self):
-        pass
\ No newline at end of file
+    def write_TAC(self, value: int):
+        self.TAC = value & 0x7
+        self.schedule_overflow()